@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+band_yaml
+---------
+streaming reader of phonopy band.yaml
+
+band.yaml with eigenvectors becomes gigabytes for large cells.
+The readers in this module walk yaml events (libyaml parser if available)
+and never build the whole document. Frequencies and eigenvectors are
+written into preallocated numpy arrays or '.npy' memory-mapped files.
+"""
+
+import os
+import yaml
+import numpy as np
+from aiidaplus.io import YamlLoader
+
+
+def _resolve(event):
+    """
+    get python value of scalar event
+    """
+    if event.style:
+        # quoted
+        return event.value
+    for typ in (int, float):
+        try:
+            return typ(event.value)
+        except ValueError:
+            pass
+    return event.value
+
+
+def _compose(events, event):
+    """
+    build small python object whose start event is 'event'
+    """
+    if isinstance(event, yaml.ScalarEvent):
+        return _resolve(event)
+    if isinstance(event, yaml.SequenceStartEvent):
+        items = []
+        for item in events:
+            if isinstance(item, yaml.SequenceEndEvent):
+                return items
+            items.append(_compose(events, item))
+    if isinstance(event, yaml.MappingStartEvent):
+        dic = {}
+        for key in events:
+            if isinstance(key, yaml.MappingEndEvent):
+                return dic
+            dic[_resolve(key)] = _compose(events, next(events))
+    raise ValueError("unexpected yaml event: %s" % event)
+
+
+def _skip(events, event):
+    """
+    skip events of node whose start event is 'event'
+    """
+    depth = 0
+    while True:
+        if isinstance(event, (yaml.SequenceStartEvent,
+                              yaml.MappingStartEvent)):
+            depth += 1
+        elif isinstance(event, (yaml.SequenceEndEvent,
+                                yaml.MappingEndEvent)):
+            depth -= 1
+        if depth == 0:
+            return
+        event = next(events)
+
+
+def _fill(events, event, buf:np.ndarray) -> int:
+    """
+    write all scalars of node whose start event is 'event' into 1d buffer
+
+    Returns:
+        int: the number of written scalars
+    """
+    depth = 0
+    i = 0
+    while True:
+        if isinstance(event, yaml.ScalarEvent):
+            buf[i] = float(event.value)
+            i += 1
+        elif isinstance(event, (yaml.SequenceStartEvent,
+                                yaml.MappingStartEvent)):
+            depth += 1
+        elif isinstance(event, (yaml.SequenceEndEvent,
+                                yaml.MappingEndEvent)):
+            depth -= 1
+        if depth == 0:
+            return i
+        event = next(events)
+
+
+def _iter_mapping(events):
+    """
+    iterate (key, start event of value) until mapping end
+    """
+    for key in events:
+        if isinstance(key, yaml.MappingEndEvent):
+            return
+        yield (key.value, next(events))
+
+
+def _iter_sequence(events):
+    """
+    iterate start event of items until sequence end
+    """
+    for item in events:
+        if isinstance(item, yaml.SequenceEndEvent):
+            return
+        yield item
+
+
+def _allocate(shape, dtype, dirname, name):
+    if dirname is None:
+        return np.zeros(shape, dtype=dtype)
+    return np.lib.format.open_memmap(os.path.join(dirname, name+'.npy'),
+                                     mode='w+', dtype=dtype, shape=shape)
+
+
+def _read(filename, with_bands, with_eigenvectors, dirname):
+    with open(filename) as f:
+        events = iter(yaml.parse(f, Loader=YamlLoader))
+        for event in events:
+            if isinstance(event, yaml.MappingStartEvent):
+                break
+        data = {}
+        for key, event in _iter_mapping(events):
+            if key != 'phonon':
+                data[key] = _compose(events, event)
+                continue
+            for required in ('nqpoint', 'natom'):
+                if required not in data:
+                    raise ValueError("'%s' does not exist before 'phonon' "
+                                     "in %s" % (required, filename))
+            nqpoint = data['nqpoint']
+            nband = data['natom'] * 3
+            qpositions = np.zeros((nqpoint, 3))
+            distances = np.zeros(nqpoint)
+            qlabels = {}
+            frequencies = None
+            eigenvectors = None
+            if with_bands:
+                if dirname is not None:
+                    os.makedirs(dirname, exist_ok=True)
+                frequencies = _allocate((nqpoint, nband), 'double',
+                                        dirname, 'frequencies')
+            for iq, qpoint in enumerate(_iter_sequence(events)):
+                for qkey, qevent in _iter_mapping(events):
+                    if qkey == 'q-position':
+                        _fill(events, qevent, qpositions[iq])
+                    elif qkey == 'distance':
+                        distances[iq] = float(qevent.value)
+                    elif qkey == 'label':
+                        qlabels[iq] = _resolve(qevent)
+                    elif qkey == 'band' and with_bands:
+                        for ib, band in enumerate(_iter_sequence(events)):
+                            for bkey, bevent in _iter_mapping(events):
+                                if bkey == 'frequency':
+                                    frequencies[iq, ib] = float(bevent.value)
+                                elif bkey == 'eigenvector' \
+                                        and with_eigenvectors:
+                                    if eigenvectors is None:
+                                        eigenvectors = _allocate(
+                                                (nqpoint, nband, nband),
+                                                'cdouble',
+                                                dirname,
+                                                'eigenvectors')
+                                    _fill(events, bevent,
+                                          eigenvectors[iq, ib].view('double'))
+                                else:
+                                    _skip(events, bevent)
+                    else:
+                        _skip(events, qevent)
+            data['q-positions'] = qpositions
+            data['distances'] = distances
+            data['q-labels'] = qlabels
+            if with_bands:
+                data['frequencies'] = frequencies
+                data['eigenvectors'] = eigenvectors
+    return data
+
+
+def read_band_yaml_header(filename:str) -> dict:
+    """
+    read band.yaml without frequencies and eigenvectors
+
+    Args:
+        filename (str): band.yaml
+
+    Returns:
+        dict: all top level entries except 'phonon', such as 'nqpoint',
+              'segment_nqpoint', 'labels', 'natom', 'lattice', 'points',
+              and also 'q-positions' (nqpoint, 3), 'distances' (nqpoint,)
+              and 'q-labels' {qpoint index: label}
+    """
+    return _read(filename,
+                 with_bands=False,
+                 with_eigenvectors=False,
+                 dirname=None)
+
+
+def read_band_yaml(filename:str,
+                   with_eigenvectors:bool=True,
+                   dirname:str=None) -> dict:
+    """
+    read band.yaml, frequencies and eigenvectors are streamed into arrays
+
+    Args:
+        filename (str): band.yaml
+        with_eigenvectors (bool): if False, eigenvectors are skipped
+        dirname (str): if specified, arrays are memory-mapped files
+                       'frequencies.npy' and 'eigenvectors.npy'
+                       in this directory
+
+    Returns:
+        dict: 'read_band_yaml_header' and 'frequencies' (nqpoint, nband),
+              'eigenvectors' (nqpoint, nband, natom*3) complex,
+              'eigenvectors' is None if they are not stored in band.yaml
+
+    Raises:
+        ValueError: 'nqpoint' or 'natom' is not found before 'phonon'
+    """
+    return _read(filename,
+                 with_bands=True,
+                 with_eigenvectors=with_eigenvectors,
+                 dirname=dirname)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+cache
+-----
+persistent caches for the results computed from immutable aiida nodes
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from contextlib import contextmanager
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'aiidaplus')
+
+
+def get_cache_dir() -> str:
+    """
+    get cache directory
+
+    Note:
+        The cache directory can be changed by 'AIIDAPLUS_CACHE_DIR'
+        environment variable.
+    """
+    return os.environ.get('AIIDAPLUS_CACHE_DIR', DEFAULT_CACHE_DIR)
+
+
+class SymmetryCache():
+    """
+    SQLite cache for symmetry analysis of StructureData
+
+    StructureData is immutable, so the analysis for a given (node uuid,
+    symprec) never changes. Entries are evicted from the least recently
+    used one when the number of entries exceeds 'maxsize'.
+    """
+    def __init__(self,
+                 filename:str=None,
+                 maxsize:int=100000):
+        """
+        Args:
+            filename (str): sqlite database file, if None,
+                            'symmetry.sqlite' in cache directory is used
+            maxsize (int): max number of entries
+        """
+        if filename is None:
+            filename = os.path.join(get_cache_dir(), 'symmetry.sqlite')
+        self.filename = filename
+        self.maxsize = maxsize
+        dirname = os.path.dirname(os.path.abspath(filename))
+        os.makedirs(dirname, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS symmetry ("
+                         "uuid TEXT, symprec REAL, data TEXT, atime REAL, "
+                         "PRIMARY KEY (uuid, symprec))")
+            conn.execute("CREATE INDEX IF NOT EXISTS symmetry_atime "
+                         "ON symmetry (atime)")
+
+    @contextmanager
+    def _connect(self):
+        """
+        connect in transaction, which is committed and closed on exit
+        """
+        conn = sqlite3.connect(self.filename, timeout=30.)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, uuid:str, symprec:float) -> dict:
+        """
+        get cached data
+
+        Returns:
+            dict: cached data, None if not cached
+        """
+        with self._connect() as conn:
+            row = conn.execute(
+                    "SELECT data FROM symmetry WHERE uuid=? AND symprec=?",
+                    (uuid, symprec)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                    "UPDATE symmetry SET atime=? WHERE uuid=? AND symprec=?",
+                    (time.time(), uuid, symprec))
+        return json.loads(row[0])
+
+    def set(self, uuid:str, symprec:float, data:dict):
+        """
+        set data and evict least recently used entries
+        """
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO symmetry VALUES (?,?,?,?)",
+                         (uuid, symprec, json.dumps(data), time.time()))
+            count = conn.execute("SELECT COUNT(*) FROM symmetry").fetchone()[0]
+            if count > self.maxsize:
+                conn.execute(
+                        "DELETE FROM symmetry WHERE rowid IN ("
+                        "SELECT rowid FROM symmetry ORDER BY atime LIMIT ?)",
+                        (count - self.maxsize,))
+
+    def clear(self):
+        """
+        remove all entries
+        """
+        with self._connect() as conn:
+            conn.execute("DELETE FROM symmetry")
+
+
+_SYMMETRY_CACHE = {'cache': None, 'initialized': False}
+
+def get_symmetry_cache() -> SymmetryCache:
+    """
+    get symmetry cache used in aiidaplus.get_data
+
+    Note:
+        If 'AIIDAPLUS_NO_CACHE' environment variable is set,
+        cache is not used and this returns None.
+    """
+    if not _SYMMETRY_CACHE['initialized']:
+        if not os.environ.get('AIIDAPLUS_NO_CACHE'):
+            _SYMMETRY_CACHE['cache'] = SymmetryCache()
+        _SYMMETRY_CACHE['initialized'] = True
+    return _SYMMETRY_CACHE['cache']
+
+def set_symmetry_cache(cache:SymmetryCache):
+    """
+    set symmetry cache used in aiidaplus.get_data, if None, disable cache
+    """
+    _SYMMETRY_CACHE['cache'] = cache
+    _SYMMETRY_CACHE['initialized'] = True
+
+
+class ArrayCache():
+    """
+    directory cache of numpy arrays which are loaded with memory mapping
+
+    Each entry is saved as '<sha1 of key>.npy'. Entries are evicted from
+    the least recently used one when the total size exceeds 'maxbytes',
+    and entries not used for 'maxage' seconds are evicted.
+    """
+    def __init__(self,
+                 dirname:str,
+                 maxbytes:int=10*1024**3,
+                 maxage:float=None):
+        """
+        Args:
+            dirname (str): cache directory
+            maxbytes (int): max total size of cached files
+            maxage (float): max age [s] from the last use, if None,
+                            entries are not evicted by age
+        """
+        self.dirname = dirname
+        self.maxbytes = maxbytes
+        self.maxage = maxage
+        os.makedirs(dirname, exist_ok=True)
+
+    def get_filename(self, key:str) -> str:
+        """
+        get cache file name of key
+        """
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.dirname, digest + '.npy')
+
+    def get(self, key:str, mmap_mode:str='r') -> np.ndarray:
+        """
+        get cached array
+
+        Args:
+            mmap_mode (str): memory mapping mode of np.load, use 'c'
+                             (copy on write) if array may be changed in place
+
+        Returns:
+            np.ndarray: memory mapped array, None if not cached
+        """
+        filename = self.get_filename(key)
+        try:
+            array = np.load(filename, mmap_mode=mmap_mode)
+        except FileNotFoundError:
+            return None
+        os.utime(filename)
+        return array
+
+    def set(self, key:str, array:np.ndarray):
+        """
+        set array and evict least recently used entries
+        """
+        filename = self.get_filename(key)
+        tmpfile = '{}.{}.tmp.npy'.format(filename[:-4], os.getpid())
+        np.save(tmpfile, array)
+        os.replace(tmpfile, filename)
+        self.evict()
+
+    def evict(self):
+        """
+        remove entries older than maxage, and least recently used entries
+        until total size is under maxbytes
+        """
+        entries = []
+        for name in os.listdir(self.dirname):
+            if not name.endswith('.npy') or '.tmp' in name:
+                continue
+            stat = os.stat(os.path.join(self.dirname, name))
+            entries.append((stat.st_mtime, stat.st_size, name))
+        entries.sort()
+        total = sum([ entry[1] for entry in entries ])
+        expired = -np.inf if self.maxage is None else time.time() - self.maxage
+        for mtime, size, name in entries:
+            if total <= self.maxbytes and mtime >= expired:
+                break
+            try:
+                os.remove(os.path.join(self.dirname, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        remove all entries
+        """
+        for name in os.listdir(self.dirname):
+            if name.endswith('.npy'):
+                os.remove(os.path.join(self.dirname, name))
+
+
+def get_force_constants_key(force_sets_uuid:str,
+                            supercell_matrix,
+                            primitive_matrix) -> str:
+    """
+    get force constants cache key
+    """
+    return json.dumps([force_sets_uuid,
+                       np.array(supercell_matrix).tolist(),
+                       np.array(primitive_matrix).tolist()])
+
+
+_FORCE_CONSTANTS_CACHE = {'cache': None, 'initialized': False}
+
+def get_force_constants_cache() -> ArrayCache:
+    """
+    get force constants cache used in aiidaplus.get_data
+
+    Note:
+        If 'AIIDAPLUS_NO_CACHE' environment variable is set,
+        cache is not used and this returns None.
+    """
+    if not _FORCE_CONSTANTS_CACHE['initialized']:
+        if not os.environ.get('AIIDAPLUS_NO_CACHE'):
+            _FORCE_CONSTANTS_CACHE['cache'] = ArrayCache(
+                    os.path.join(get_cache_dir(), 'force_constants'))
+        _FORCE_CONSTANTS_CACHE['initialized'] = True
+    return _FORCE_CONSTANTS_CACHE['cache']
+
+def set_force_constants_cache(cache:ArrayCache):
+    """
+    set force constants cache used in aiidaplus.get_data, if None,
+    disable cache
+    """
+    _FORCE_CONSTANTS_CACHE['cache'] = cache
+    _FORCE_CONSTANTS_CACHE['initialized'] = True
+
+
+def get_phonon_hash(phonon) -> str:
+    """
+    get sha1 of force constants, primitive matrix, primitive cell
+    and nac params of phonopy object
+    """
+    sha1 = hashlib.sha1()
+    primitive = phonon.get_primitive()
+    for array in [phonon.get_force_constants(),
+                  phonon.get_primitive_matrix(),
+                  primitive.cell,
+                  primitive.scaled_positions,
+                  primitive.masses,
+                  phonon.unit_conversion_factor]:
+        sha1.update(np.ascontiguousarray(array, dtype='double').tobytes())
+    nac_params = phonon.get_nac_params()
+    if nac_params is not None:
+        for key in sorted(nac_params.keys()):
+            sha1.update(key.encode('utf-8'))
+            sha1.update(np.array(nac_params[key]).tobytes())
+    return sha1.hexdigest()
+
+
+def get_band_key(phonon_hash:str, qpoints) -> str:
+    """
+    get band cache key, q-path and npoints are included in qpoints
+    """
+    qpoints_hash = hashlib.sha1(
+            np.ascontiguousarray(np.round(qpoints, 8),
+                                 dtype='double').tobytes()).hexdigest()
+    return json.dumps(['band', phonon_hash, qpoints_hash])
+
+
+def get_dos_key(phonon_hash:str,
+                mesh,
+                sigma=None,
+                use_tetrahedron_method=False,
+                freq_min=None,
+                freq_max=None,
+                freq_pitch=None) -> str:
+    """
+    get total dos cache key
+    """
+    return json.dumps(['dos', phonon_hash, np.ravel(mesh).tolist(), sigma,
+                       use_tetrahedron_method, freq_min, freq_max, freq_pitch])
+
+
+_PHONON_CACHE = {'cache': None, 'initialized': False}
+
+def get_phonon_cache() -> ArrayCache:
+    """
+    get band and dos cache used in aiidaplus.plot
+
+    Note:
+        Entries are evicted when total size exceeds 1 GiB or they are
+        not used for 30 days.
+        If 'AIIDAPLUS_NO_CACHE' environment variable is set,
+        cache is not used and this returns None.
+    """
+    if not _PHONON_CACHE['initialized']:
+        if not os.environ.get('AIIDAPLUS_NO_CACHE'):
+            _PHONON_CACHE['cache'] = ArrayCache(
+                    os.path.join(get_cache_dir(), 'phonon'),
+                    maxbytes=1024**3,
+                    maxage=30*24*3600.)
+        _PHONON_CACHE['initialized'] = True
+    return _PHONON_CACHE['cache']
+
+def set_phonon_cache(cache:ArrayCache):
+    """
+    set band and dos cache used in aiidaplus.plot, if None, disable cache
+    """
+    _PHONON_CACHE['cache'] = cache
+    _PHONON_CACHE['initialized'] = True
@@ -0,0 +1,315 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+catalog
+-------
+offline catalog of exported files
+
+Exported files in a directory (such as 'data/relax', 'data/shear') are
+parsed once and their key scalar fields are stored in SQLite table.
+Only new or modified files (by mtime and size) are parsed on update,
+and queries never touch exported files.
+
+Examples:
+    >>> catalog = Catalog('data')
+    >>> catalog.update()
+    >>> catalog.query(data_type='RelaxWorkChain', encut=(300, None))
+"""
+
+import os
+import re
+import sqlite3
+import warnings
+from contextlib import contextmanager
+from aiidaplus.io import load_data, is_supported_file
+
+CATALOG_FILENAME = '.aiidaplus-catalog.sqlite'
+
+# (name, sqlite type)
+CATALOG_FIELDS = [
+        ('pk', 'INTEGER'),
+        ('data_type', 'TEXT'),
+        ('encut', 'REAL'),
+        ('sigma', 'REAL'),
+        ('kpoint_density', 'REAL'),
+        ('energy', 'REAL'),
+        ('natoms', 'INTEGER'),
+        ('space_group', 'INTEGER'),
+        ('international', 'TEXT'),
+        ]
+
+
+_INTERNATIONAL_NUMBERS = {}
+
+def _get_spacegroup_type(hall_number:int) -> dict:
+    import spglib
+    spacegroup_type = spglib.get_spacegroup_type(hall_number)
+    if isinstance(spacegroup_type, dict):
+        return spacegroup_type
+    # spglib>=2.5 returns dataclass
+    return {'number': spacegroup_type.number,
+            'international_short': spacegroup_type.international_short}
+
+def get_space_group_number(structure:dict) -> int:
+    """
+    get space group number of exported structure data
+
+    Note:
+        Older exports have no 'number', then it is derived from
+        'hall_number', or from 'international' (short symbol).
+        None if not found.
+    """
+    if structure.get('number') is not None:
+        return structure['number']
+    if structure.get('hall_number') is not None:
+        return int(_get_spacegroup_type(structure['hall_number'])['number'])
+    if structure.get('international') is None:
+        return None
+    if not _INTERNATIONAL_NUMBERS:
+        for hall_number in range(1, 531):
+            spacegroup_type = _get_spacegroup_type(hall_number)
+            _INTERNATIONAL_NUMBERS.setdefault(
+                    spacegroup_type['international_short'],
+                    int(spacegroup_type['number']))
+    return _INTERNATIONAL_NUMBERS.get(structure['international'])
+
+
+def _get_structure_fields(structure:dict) -> dict:
+    return {
+        'natoms': structure.get('natoms'),
+        'space_group': get_space_group_number(structure),
+        'international': structure.get('international'),
+        }
+
+
+def _get_vasp_fields(dic:dict) -> dict:
+    incar = dic.get('incar', {})
+    structures = dic.get('structure', {})
+    fields = _get_structure_fields(
+            structures.get('final', structures.get('initial', {})))
+    fields.update({
+        'encut': incar.get('encut'),
+        'sigma': incar.get('sigma'),
+        'kpoint_density': dic.get('kpoints', {}).get('density'),
+        'energy': dic.get('energy_no_entropy'),
+        })
+    return fields
+
+
+def _get_relax_fields(dic:dict) -> dict:
+    steps = dic['steps']
+    keys = sorted(steps.keys())
+    fields = _get_vasp_fields(steps[keys[0]])
+    last = steps[keys[-1]].get('structure', {})
+    fields.update(_get_structure_fields(last.get('final', {})))
+    fields['energy'] = dic.get('final_energy_no_entropy')
+    return fields
+
+
+def _get_shear_fields(dic:dict) -> dict:
+    incar = dic.get('calculator_settings', {}) \
+               .get('relax', {}).get('incar_settings', {})
+    fields = _get_structure_fields(dic.get('parent', {}))
+    energies = dic.get('relax_results', {}).get('energies', [])
+    fields.update({
+        'encut': incar.get('encut'),
+        'sigma': incar.get('sigma'),
+        'energy': energies[0] if len(energies) > 0 else None,
+        })
+    return fields
+
+
+def _get_phonon_fields(dic:dict) -> dict:
+    space_group = dic.get('space_group', {})
+    return {
+        'natoms': len(dic.get('unit_cell', {}).get('points', [])),
+        'space_group': space_group.get('number'),
+        'international': space_group.get('type'),
+        }
+
+
+_EXTRACTORS = {
+        'StructureData': _get_structure_fields,
+        'VaspWorkChain': _get_vasp_fields,
+        'RelaxWorkChain': _get_relax_fields,
+        'ShearWorkChain': _get_shear_fields,
+        'PhonopyWorkChain': _get_phonon_fields,
+        }
+
+
+def get_data_type(dic:dict) -> str:
+    """
+    get data type of exported data, None if unknown
+
+    Note:
+        Shear data and phonopy params have no 'data_type' key,
+        they are detected by their keys.
+    """
+    if 'data_type' in dic:
+        return dic['data_type']
+    if 'phonopy' in dic:
+        return 'PhonopyWorkChain'
+    if 'shear_ratios' in dic:
+        return 'ShearWorkChain'
+    return None
+
+
+def get_catalog_fields(dic:dict, filename:str=None) -> dict:
+    """
+    get catalog fields from exported data
+
+    Args:
+        dic (dict): exported data
+        filename (str): file name, pk is taken from 'pk<pk>_' in file name
+                        if data has no 'pk'
+
+    Returns:
+        dict: fields in CATALOG_FIELDS, None if not found
+    """
+    fields = { name: None for name, _ in CATALOG_FIELDS }
+    data_type = get_data_type(dic)
+    fields['data_type'] = data_type
+    fields['pk'] = dic.get('pk')
+    if fields['pk'] is None and filename is not None:
+        match = re.match(r'pk(\d+)_', os.path.basename(filename))
+        if match:
+            fields['pk'] = int(match.group(1))
+    if data_type in _EXTRACTORS:
+        fields.update(_EXTRACTORS[data_type](dic))
+    return fields
+
+
+class Catalog():
+    """
+    SQLite catalog of exported files in directory
+    """
+
+    def __init__(self, dirname:str, filename:str=None):
+        """
+        Args:
+            dirname (str): export directory, scanned recursively
+            filename (str): catalog file, if None,
+                            '<dirname>/.aiidaplus-catalog.sqlite'
+        """
+        self.dirname = os.path.abspath(dirname)
+        if filename is None:
+            filename = os.path.join(self.dirname, CATALOG_FILENAME)
+        self.filename = filename
+        columns = ', '.join([ '%s %s' % field for field in CATALOG_FIELDS ])
+        with self._connect() as conn:
+            conn.execute(
+                    "CREATE TABLE IF NOT EXISTS catalog ("
+                    "path TEXT PRIMARY KEY, mtime REAL, size INTEGER, %s)"
+                    % columns)
+            conn.execute("CREATE INDEX IF NOT EXISTS catalog_data_type "
+                         "ON catalog (data_type)")
+            conn.execute("CREATE INDEX IF NOT EXISTS catalog_pk "
+                         "ON catalog (pk)")
+
+    @contextmanager
+    def _connect(self):
+        """
+        connect in transaction, which is committed and closed on exit
+        """
+        conn = sqlite3.connect(self.filename)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _scan(self) -> dict:
+        files = {}
+        for root, _, filenames in os.walk(self.dirname):
+            for filename in filenames:
+                if filename.startswith('.') \
+                        or not is_supported_file(filename) \
+                        or filename.endswith('.manifest.json'):
+                    continue
+                path = os.path.join(root, filename)
+                stat = os.stat(path)
+                files[os.path.relpath(path, self.dirname)] = \
+                        (stat.st_mtime, stat.st_size)
+        return files
+
+    def update(self) -> dict:
+        """
+        index new or modified files, and remove deleted files
+
+        Returns:
+            dict: the number of 'indexed', 'removed' and 'unchanged' files
+        """
+        files = self._scan()
+        with self._connect() as conn:
+            indexed = { path: (mtime, size) for path, mtime, size in
+                        conn.execute("SELECT path, mtime, size FROM catalog") }
+            removed = [ path for path in indexed if path not in files ]
+            conn.executemany("DELETE FROM catalog WHERE path = ?",
+                             [ (path,) for path in removed ])
+            names = ['path', 'mtime', 'size'] \
+                        + [ name for name, _ in CATALOG_FIELDS ]
+            sql = "INSERT OR REPLACE INTO catalog (%s) VALUES (%s)" \
+                      % (', '.join(names), ', '.join(['?'] * len(names)))
+            count = 0
+            for path, stat in files.items():
+                if indexed.get(path) == stat:
+                    continue
+                try:
+                    dic = load_data(os.path.join(self.dirname, path))
+                    fields = get_catalog_fields(dic, path)
+                except Exception as err:
+                    warnings.warn("failed to index {}: {}".format(path, err))
+                    continue
+                conn.execute(sql, [path, stat[0], stat[1]]
+                                  + [ fields[name]
+                                          for name, _ in CATALOG_FIELDS ])
+                count += 1
+        return {'indexed': count,
+                'removed': len(removed),
+                'unchanged': len(files) - count}
+
+    def query(self, order_by:str='pk', **filters) -> list:
+        """
+        query catalog
+
+        Args:
+            order_by (str): field to sort
+            filters: field=value for equality, or field=(min, max)
+                     for range, min or max can be None
+
+        Returns:
+            list: list of dict with 'path' (absolute), 'mtime', 'size'
+                  and CATALOG_FIELDS
+
+        Raises:
+            ValueError: unknown field
+        """
+        names = ['path', 'mtime', 'size'] \
+                    + [ name for name, _ in CATALOG_FIELDS ]
+        for name in list(filters.keys()) + [order_by]:
+            if name not in names:
+                raise ValueError("unknown field: %s" % name)
+        conditions = []
+        params = []
+        for name, value in filters.items():
+            if isinstance(value, (tuple, list)):
+                if value[0] is not None:
+                    conditions.append("%s >= ?" % name)
+                    params.append(value[0])
+                if value[1] is not None:
+                    conditions.append("%s <= ?" % name)
+                    params.append(value[1])
+            else:
+                conditions.append("%s = ?" % name)
+                params.append(value)
+        sql = "SELECT %s FROM catalog" % ', '.join(names)
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY %s" % order_by
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        results = [ dict(zip(names, row)) for row in rows ]
+        for result in results:
+            result['path'] = os.path.join(self.dirname, result['path'])
+        return results
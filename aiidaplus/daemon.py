@@ -0,0 +1,199 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+daemon
+------
+warm export daemon which keeps aiida profile loaded and modules imported
+
+Requests and responses are JSON lines over unix domain socket.
+Only standard library is imported at module level, so the client
+('request') starts in milliseconds.
+
+Requests:
+    {'mode': 'data', 'pk': pk, 'output': filename}
+        export node data, format is detected by extension
+    {'mode': 'group', 'group': label, 'output': filename,
+     'incremental': bool}
+        export group to JSON Lines
+    {'mode': 'ping'}
+    {'mode': 'shutdown'}
+
+Responses:
+    {'status': 'ok' or 'error', 'elapsed': seconds, ...}
+"""
+
+import os
+import json
+import time
+import socket
+import tempfile
+import importlib
+import threading
+import socketserver
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def get_default_socket() -> str:
+    """
+    get default socket file
+
+    Note:
+        The socket file can be changed by 'AIIDAPLUS_EXPORTD_SOCKET'
+        environment variable.
+    """
+    return os.environ.get(
+            'AIIDAPLUS_EXPORTD_SOCKET',
+            os.path.join(tempfile.gettempdir(),
+                         'aiidaplus-exportd-%d.sock' % os.getuid()))
+
+
+def request(req:dict, socket_path:str=None, timeout:float=None) -> dict:
+    """
+    send request to export daemon
+
+    Args:
+        req (dict): request
+        socket_path (str): socket file, if None, use default
+        timeout (float): timeout in seconds, if None, wait until finished
+
+    Returns:
+        dict: response
+    """
+    if socket_path is None:
+        socket_path = get_default_socket()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(req) + '\n').encode('utf-8'))
+        with sock.makefile('r') as f:
+            line = f.readline()
+    return json.loads(line)
+
+
+def is_running(socket_path:str=None) -> bool:
+    """
+    check export daemon is running
+    """
+    try:
+        return request({'mode': 'ping'}, socket_path, timeout=5.)['status'] \
+                == 'ok'
+    except (OSError, ValueError):
+        return False
+
+
+def _init_worker(profile):
+    from aiida import load_profile
+    load_profile(profile)
+    # import here, then requests do not pay for it
+    importlib.import_module('aiidaplus.export')
+
+
+def _warm_up() -> int:
+    return os.getpid()
+
+
+def _start_executor(workers:int, profile:str) -> ProcessPoolExecutor:
+    """
+    start worker processes and wait until all of them load aiida profile
+
+    Note:
+        Processes of spawn context pool start on demand, so 'workers'
+        tasks are submitted at once, then each worker runs
+        '_init_worker' before the first request arrives.
+    """
+    # workers are spawned, not forked, so that db connections are not shared
+    executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(profile,))
+    futures = [ executor.submit(_warm_up) for _ in range(workers) ]
+    for future in futures:
+        future.result()
+    return executor
+
+
+def _run_request(req:dict) -> dict:
+    from aiidaplus.export import export_node, export_group
+    if req['mode'] == 'data':
+        data_type = export_node(req['pk'], req['output'])
+        return {'output': req['output'], 'exporter': data_type}
+    elif req['mode'] == 'group':
+        count = export_group(req['group'],
+                             req['output'],
+                             progress=False,
+                             incremental=req.get('incremental', False))
+        return {'output': req['output'], 'count': count}
+    else:
+        raise ValueError("mode %s is not supported" % req['mode'])
+
+
+def serve(socket_path:str=None, workers:int=4, profile:str=None):
+    """
+    run export daemon until 'shutdown' request
+
+    Args:
+        socket_path (str): socket file, if None, use default
+        workers (int): the number of worker processes, each of them loads
+                       aiida profile once at start
+        profile (str): aiida profile name, if None, use default profile
+
+    Raises:
+        RuntimeError: export daemon is already running
+    """
+    if socket_path is None:
+        socket_path = get_default_socket()
+    if os.path.exists(socket_path):
+        if is_running(socket_path):
+            raise RuntimeError("export daemon is already running: %s"
+                               % socket_path)
+        os.remove(socket_path)
+
+    pool = {'executor': _start_executor(workers, profile)}
+    lock = threading.Lock()
+
+    def _submit(req):
+        executor = pool['executor']
+        try:
+            return executor.submit(_run_request, req).result()
+        except BrokenProcessPool:
+            # some worker crashed, restart pool for the next requests
+            with lock:
+                if pool['executor'] is executor:
+                    executor.shutdown(wait=False)
+                    pool['executor'] = _start_executor(workers, profile)
+            raise
+
+    class _Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            start = time.time()
+            try:
+                req = json.loads(self.rfile.readline())
+                if req['mode'] == 'ping':
+                    response = {}
+                elif req['mode'] == 'shutdown':
+                    response = {}
+                    threading.Thread(target=server.shutdown).start()
+                else:
+                    response = _submit(req)
+                response['status'] = 'ok'
+            except Exception as err:
+                response = {'status': 'error',
+                            'error': "{}: {}".format(type(err).__name__, err)}
+            response['elapsed'] = time.time() - start
+            self.wfile.write((json.dumps(response) + '\n').encode('utf-8'))
+
+    server = socketserver.ThreadingUnixStreamServer(socket_path, _Handler)
+    os.chmod(socket_path, 0o600)
+    print("export daemon is listening on {} with {} workers".format(
+        socket_path, workers))
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        pool['executor'].shutdown()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
@@ -0,0 +1,250 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+export
+------
+export data of many nodes in aiida group
+"""
+
+import os
+import sys
+import gzip
+import json
+import warnings
+from aiida.orm import QueryBuilder, Group, Node
+from aiidaplus.io import write_data, _json_default
+from aiidaplus.get_data import (get_structure_data,
+                                get_vasp_data,
+                                get_relax_data,
+                                get_phonon_data,
+                                get_shear_data,
+                                get_twinboundary_relax_data,
+                                )
+
+# increase this when the format of exported data changes,
+# then incremental export exports all nodes again
+EXPORTER_VERSION = 1
+
+NODE_TYPE_EXPORTERS = {
+        'data.structure.StructureData.': get_structure_data,
+        }
+
+PROCESS_TYPE_EXPORTERS = {
+        'aiida.workflows:vasp.vasp': get_vasp_data,
+        'aiida.workflows:vasp.relax': get_relax_data,
+        'aiida.workflows:phonopy.phonopy': get_phonon_data,
+        'aiida.workflows:twinpy.shear': get_shear_data,
+        'aiida.workflows:twinpy.twinboundary_relax': \
+                get_twinboundary_relax_data,
+        }
+
+
+def get_exporter(node_type:str, process_type:str):
+    """
+    get 'get_*_data' function for node
+
+    Returns:
+        function: exporter, None if node is not supported
+    """
+    if node_type in NODE_TYPE_EXPORTERS:
+        return NODE_TYPE_EXPORTERS[node_type]
+    return PROCESS_TYPE_EXPORTERS.get(process_type, None)
+
+
+def export_node(pk, filename:str) -> str:
+    """
+    export data of node with the matching 'get_*_data' function
+
+    Args:
+        pk: node pk
+        filename (str): output file name, format is detected by extension,
+                        see aiidaplus.io.write_data
+
+    Returns:
+        str: data type of the exported node
+
+    Raises:
+        ValueError: node is not supported
+    """
+    qb = QueryBuilder()
+    qb.append(Node, filters={'id': {'==': pk}},
+              project=['node_type', 'process_type'])
+    node_type, process_type = qb.one()
+    exporter = get_exporter(node_type, process_type)
+    if exporter is None:
+        raise ValueError("node type %s (process type %s) is not supported"
+                         % (node_type, process_type))
+    data = exporter(pk)
+    if isinstance(data, tuple):
+        data = data[0]
+    write_data(data, filename)
+    return exporter.__name__
+
+
+def get_group_nodes(group_label:str) -> list:
+    """
+    get supported nodes in group with one query
+
+    Args:
+        group_label (str): group label
+
+    Returns:
+        list: list of dict with 'pk', 'uuid', 'mtime', 'node_type',
+              'process_type', mtime is isoformat string
+    """
+    qb = QueryBuilder()
+    qb.append(Group, filters={'label': {'==': group_label}}, tag='group')
+    qb.append(Node,
+              with_group='group',
+              filters={'or': [
+                  {'node_type': {'in': list(NODE_TYPE_EXPORTERS.keys())}},
+                  {'process_type': {
+                      'in': list(PROCESS_TYPE_EXPORTERS.keys())}},
+                  ]},
+              project=['id', 'uuid', 'mtime', 'node_type', 'process_type'],
+              tag='node')
+    qb.order_by({'node': {'id': 'asc'}})
+    keys = ['pk', 'uuid', 'mtime', 'node_type', 'process_type']
+    nodes = [ dict(zip(keys, row)) for row in qb.all() ]
+    for node in nodes:
+        node['mtime'] = node['mtime'].isoformat()
+    return nodes
+
+
+def get_manifest_filename(filename:str) -> str:
+    """
+    get manifest file name for output file
+    """
+    return filename + '.manifest.json'
+
+
+def load_manifest(filename:str) -> dict:
+    """
+    load manifest, empty manifest if file does not exist
+
+    Returns:
+        dict: {uuid: {'pk', 'mtime', 'version'}}
+    """
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as f:
+        return json.load(f)['nodes']
+
+
+def save_manifest(manifest:dict, filename:str):
+    """
+    save manifest, file is replaced atomically
+    """
+    tmpfile = filename + '.tmp'
+    with open(tmpfile, 'w') as f:
+        json.dump({'version': EXPORTER_VERSION, 'nodes': manifest}, f)
+    os.replace(tmpfile, filename)
+
+
+def is_exported(node:dict, manifest:dict) -> bool:
+    """
+    check node is already exported and not modified since then
+    """
+    entry = manifest.get(node['uuid'], None)
+    return entry is not None \
+            and entry['mtime'] == node['mtime'] \
+            and entry['version'] == EXPORTER_VERSION
+
+
+def open_jsonl(filename:str, mode:str='wt'):
+    """
+    open JSON Lines file, gzip compressed if filename ends with '.gz'
+    """
+    if filename.endswith('.gz'):
+        return gzip.open(filename, mode)
+    return open(filename, mode.replace('t', ''))
+
+
+def export_nodes(nodes:list, f, progress:bool=True, manifest:dict=None) -> int:
+    """
+    export nodes to JSON Lines record by record
+
+    Args:
+        nodes (list): nodes from 'get_group_nodes'
+        f: file object opened by 'open_jsonl'
+        progress (bool): if True, show progress counter in stderr
+        manifest (dict): if not None, exported nodes are recorded
+
+    Returns:
+        int: the number of exported nodes
+
+    Note:
+        Each line is {'pk', 'uuid', 'mtime', 'node_type', 'process_type',
+        'data'}.
+        Only one record is held in memory at once.
+        If exporting some node fails, it is skipped with warning.
+    """
+    count = 0
+    for i, node in enumerate(nodes):
+        exporter = get_exporter(node['node_type'], node['process_type'])
+        try:
+            data = exporter(node['pk'])
+        except Exception as err:
+            warnings.warn("failed to export pk:{}, {}: {}".format(
+                node['pk'], type(err).__name__, err))
+            continue
+        if isinstance(data, tuple):
+            data = data[0]
+        record = dict(node)
+        record['data'] = data
+        f.write(json.dumps(record, default=_json_default) + '\n')
+        count += 1
+        if manifest is not None:
+            manifest[node['uuid']] = {'pk': node['pk'],
+                                      'mtime': node['mtime'],
+                                      'version': EXPORTER_VERSION}
+        if progress:
+            sys.stderr.write("\rexported {}/{} (pk:{})".format(
+                i+1, len(nodes), node['pk']))
+            sys.stderr.flush()
+    if progress:
+        sys.stderr.write("\n")
+    return count
+
+
+def export_group(group_label:str,
+                 filename:str,
+                 progress:bool=True,
+                 incremental:bool=False) -> int:
+    """
+    export all supported nodes in group to JSON Lines file
+
+    Args:
+        group_label (str): group label
+        filename (str): output file name, gzip compressed if ends with '.gz'
+        progress (bool): if True, show progress counter in stderr
+        incremental (bool): if True, only the nodes which are new or
+                            modified since the last export are exported
+                            and appended to the output file
+
+    Returns:
+        int: the number of exported nodes
+
+    Note:
+        - The manifest of exported nodes (uuid, mtime, exporter version)
+          is saved in '<filename>.manifest.json'.
+        - In incremental mode, modified nodes are appended again,
+          so the last record of each uuid is the newest one.
+    """
+    manifest_file = get_manifest_filename(filename)
+    nodes = get_group_nodes(group_label)
+    if incremental:
+        manifest = load_manifest(manifest_file)
+        nodes = [ node for node in nodes if not is_exported(node, manifest) ]
+        mode = 'at'
+    else:
+        manifest = {}
+        mode = 'wt'
+    with open_jsonl(filename, mode) as f:
+        try:
+            count = export_nodes(nodes, f, progress=progress,
+                                 manifest=manifest)
+        finally:
+            save_manifest(manifest, manifest_file)
+    return count
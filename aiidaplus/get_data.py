@@ -3,22 +3,59 @@
 
 """
 Get data from aiida pk.
+
+Note:
+    pymatgen, phonopy, twinpy and aiida workflow plugins are imported
+    only in the functions which need them, because importing them takes
+    much longer than most of the queries. Workflow classes RELAX_WF,
+    VASP_WF and PHONOPY_WF are loaded on first access, queries filter
+    nodes by process type instead.
 """
 import numpy as np
 import warnings
-from pymatgen.core.structure import Structure
-from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
-from pymatgen.io.phonopy import get_phonopy_structure
-from aiida.orm import load_node, QueryBuilder, Node, WorkChainNode, StructureData
-from aiida.common import exceptions
+import multiprocessing
+import spglib
+from copy import deepcopy
+from typing import TYPE_CHECKING
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from aiida.orm import (load_node, QueryBuilder, Node, WorkChainNode,
+                       StructureData, Data)
 from aiida.common import NotExistentAttributeError
+from aiida.common.links import LinkType
 from aiida.cmdline.utils.decorators import with_dbenv
-from aiida.plugins import WorkflowFactory
-from phonopy import Phonopy
-from twinpy.common.kpoints import get_mesh_offset_from_direct_lattice
-
-RELAX_WF = WorkflowFactory('vasp.relax')
-PHONOPY_WF = WorkflowFactory('phonopy.phonopy')
+from aiidaplus.cache import (get_symmetry_cache,
+                             get_force_constants_cache,
+                             get_force_constants_key)
+from aiidaplus.profiling import record
+if TYPE_CHECKING:
+    from pymatgen.core.structure import Structure
+
+RELAX_PROCESS_TYPE = 'aiida.workflows:vasp.relax'
+VASP_PROCESS_TYPE = 'aiida.workflows:vasp.vasp'
+PHONOPY_PROCESS_TYPE = 'aiida.workflows:phonopy.phonopy'
+_WORKFLOWS = {
+        'RELAX_WF': 'vasp.relax',
+        'VASP_WF': 'vasp.vasp',
+        'PHONOPY_WF': 'phonopy.phonopy',
+        }
+
+VASP_INPUT_LABELS = ['structure', 'parameters', 'settings', 'kpoints',
+                     'potential_family', 'potential_mapping']
+VASP_OUTPUT_LABELS = ['structure', 'misc']
+SHEAR_INPUT_LABELS = ['calculator_settings', 'shear_conf']
+SHEAR_OUTPUT_LABELS = ['parent', 'relax_results', 'shear_ratios', 'gamma']
+
+
+def __getattr__(name):
+    """
+    load workflow classes on first access
+    """
+    if name in _WORKFLOWS:
+        from aiida.plugins import WorkflowFactory
+        return WorkflowFactory(_WORKFLOWS[name])
+    raise AttributeError("module {} has no attribute {}".format(
+        __name__, name))
 
 
 @with_dbenv()
@@ -46,7 +83,7 @@ def check_process_class(node,
             format(node.process_class, expected_process_class)
 
 
-def get_structure_data_from_pymatgen(pmgstructure:Structure,
+def get_structure_data_from_pymatgen(pmgstructure:'Structure',
                                      symprec:float=1e-5) -> dict:
     """
     get structure data from pymatgen structure
@@ -57,7 +94,9 @@ def get_structure_data_from_pymatgen(pmgstructure:Structure,
     Note:
         symprec=1e-5 (default), which is the same as VASP SYMPREC default
     """
-    analyzer = SpacegroupAnalyzer(pmgstructure, symprec=symprec, angle_tolerance=1e-2)
+    from pymatgen.symmetry.analyzer import SpacegroupAnalyzer
+    with record('spglib'):
+        analyzer = SpacegroupAnalyzer(pmgstructure, symprec=symprec, angle_tolerance=1e-2)
     dataset = analyzer.get_symmetry_dataset()
 
     dic = {}
@@ -77,98 +116,534 @@ def get_structure_data_from_pymatgen(pmgstructure:Structure,
 
     return dic
 
+def _get_dataset_value(dataset, name:str):
+    """
+    get value of spglib dataset, which is dataclass for spglib>=2.5
+    (dict access is deprecated) and dict for older versions
+    """
+    if isinstance(dataset, dict):
+        return dataset[name]
+    return getattr(dataset, name)
+
+def get_structure_data_from_cell(cell:tuple,
+                                 symprec:float=1e-5) -> dict:
+    """
+    get structure data from cell without building pymatgen objects
+
+    Args:
+        cell (tuple): (lattice, frac_coords, numbers), lattice is row vectors
+        symprec (float): symprec
+
+    Returns:
+        dict: the same as 'get_structure_data_from_pymatgen'
+
+    Note:
+        symprec=1e-5 (default), which is the same as VASP SYMPREC default
+    """
+    lattice = np.array(cell[0], dtype='double')
+    with record('spglib'):
+        dataset = spglib.get_symmetry_dataset(
+                (lattice, cell[1], cell[2]),
+                symprec=symprec,
+                angle_tolerance=1e-2)
+    abc = np.linalg.norm(lattice, axis=1)
+    angles = []
+    for i in range(3):
+        j = (i + 1) % 3
+        k = (i + 2) % 3
+        cos = np.clip(np.dot(lattice[j], lattice[k]) / (abc[j] * abc[k]),
+                      -1, 1)
+        angles.append(float(np.degrees(np.arccos(cos))))
+
+    dic = {}
+    dic['symprec'] = symprec
+    dic['volume'] = float(abs(np.linalg.det(lattice)))
+    dic['lattice'] = lattice.tolist()
+    dic['lattice_abc'] = abc.tolist()
+    dic['lattice_angles'] = angles
+    dic['number'] = int(_get_dataset_value(dataset, 'number'))
+    dic['international'] = _get_dataset_value(dataset, 'international')
+    dic['pointgroup'] = _get_dataset_value(dataset, 'pointgroup')
+    dic['natoms'] = len(cell[2])
+    dic['wyckoffs'] = list(_get_dataset_value(dataset, 'wyckoffs'))
+    dic['site_symmetry_symbols'] = list(
+            _get_dataset_value(dataset, 'site_symmetry_symbols'))
+    dic['hall'] = _get_dataset_value(dataset, 'hall')
+    dic['hall_number'] = int(_get_dataset_value(dataset, 'hall_number'))
+
+    return dic
+
+def get_structure_data_from_cells(cells:list,
+                                  symprec:float=1e-5) -> list:
+    """
+    get structure data from many cells
+
+    Args:
+        cells (list): list of (lattice, frac_coords, numbers)
+        symprec (float): symprec
+
+    Returns:
+        list: structure data of each cell
+    """
+    return [ get_structure_data_from_cell(cell, symprec=symprec)
+                 for cell in cells ]
+
+def get_cell_from_attributes(attributes:dict) -> tuple:
+    """
+    get cell from StructureData attributes
+
+    Returns:
+        tuple: (lattice, frac_coords, numbers), None if some kind has
+               more than one symbol (alloy or vacancy)
+
+    Note:
+        Numbers are assigned to each chemical symbol (not kind name),
+        which is the same as pymatgen SpacegroupAnalyzer.
+    """
+    symbols = {}
+    for kind in attributes['kinds']:
+        if len(kind['symbols']) != 1 or kind['weights'][0] != 1.:
+            return None
+        symbols[kind['name']] = kind['symbols'][0]
+    site_symbols = [ symbols[site['kind_name']]
+                         for site in attributes['sites'] ]
+    unique_symbols = sorted(set(site_symbols))
+    numbers = [ unique_symbols.index(symbol) + 1 for symbol in site_symbols ]
+    lattice = np.array(attributes['cell'], dtype='double')
+    positions = np.array([ site['position'] for site in attributes['sites'] ])
+    frac_coords = np.dot(positions, np.linalg.inv(lattice))
+    return (lattice, frac_coords, numbers)
+
+def _analyze_attributes(attributes:dict, symprec:float=1e-5) -> dict:
+    """
+    analyze StructureData attributes
+
+    Note:
+        spglib is called directly with the cell from attributes,
+        pymatgen is used only for the structure with alloy kinds.
+    """
+    cell = get_cell_from_attributes(attributes)
+    if cell is None:
+        return get_structure_data_from_pymatgen(
+                _get_pmgstructure_from_attributes(attributes),
+                symprec=symprec)
+    return get_structure_data_from_cell(cell, symprec=symprec)
+
 def get_structure_data(pk, symprec=1e-5) -> dict:
     """
     get structure data from pk
 
     Note:
-        symprec=1e-5 (default), which is the same as VASP SYMPREC default
+        - symprec=1e-5 (default), which is the same as VASP SYMPREC default
+        - symmetry analysis is cached by (uuid, symprec),
+          see aiidaplus.cache.SymmetryCache
     """
     node = get_node_from_pk(pk)
-    pmgstructure = node.get_pymatgen()
-    dic = get_structure_data_from_pymatgen(pmgstructure, symprec=symprec)
-    dic['pk'] = pk
-    dic['data_type'] = 'StructureData'
-    return dic
+    return get_structure_data_many([(pk, node.uuid, node.attributes)],
+                                   symprec=symprec)[0]
 
-def get_vasp_data(pk, symprec=1e-5) -> dict:
+def _get_pmgstructure_from_attributes(attributes:dict) -> 'Structure':
+    """
+    get pymatgen structure from StructureData attributes
+
+    Note:
+        This is the same as StructureData.get_pymatgen() for the structure
+        whose kinds have a single symbol, but does not need to load the node.
+    """
+    from pymatgen.core.structure import Structure
+    species = {}
+    for kind in attributes['kinds']:
+        if len(kind['symbols']) == 1 and kind['weights'][0] == 1.:
+            species[kind['name']] = kind['symbols'][0]
+        else:
+            species[kind['name']] = dict(zip(kind['symbols'], kind['weights']))
+    return Structure(
+            lattice=attributes['cell'],
+            species=[ species[site['kind_name']]
+                          for site in attributes['sites'] ],
+            coords=[ site['position'] for site in attributes['sites'] ],
+            coords_are_cartesian=True)
+
+_STRUCTURE_ANALYSIS_STATS = {'requested': 0,
+                             'deduplicated': 0,
+                             'cached': 0,
+                             'analyzed': 0}
+
+def get_structure_analysis_stats() -> dict:
+    """
+    get the numbers of structure analyses since the last reset
+
+    Returns:
+        dict: 'requested', 'deduplicated' (the same structure in one export),
+              'cached' (found in symmetry cache), 'analyzed' (spglib called)
+    """
+    return dict(_STRUCTURE_ANALYSIS_STATS)
+
+def reset_structure_analysis_stats():
+    """
+    reset the numbers of structure analyses
+    """
+    for key in _STRUCTURE_ANALYSIS_STATS:
+        _STRUCTURE_ANALYSIS_STATS[key] = 0
+
+def get_structure_data_many(structures:list,
+                            symprec:float=1e-5,
+                            workers:int=None) -> list:
+    """
+    get structure data of many structures whose attributes are already fetched
+
+    Args:
+        structures (list): list of (pk, uuid, attributes)
+        symprec (float): symprec
+        workers (int): if larger than 1, structures which are not cached
+                       are analyzed in ProcessPoolExecutor
+
+    Returns:
+        list: structure data, the same order as 'structures'
+
+    Note:
+        - The results are the same as the serial path (workers=None).
+        - Each distinct uuid is analyzed once, and the same structure
+          in 'structures' gets a copy of the dict, so that outputs
+          do not share dicts (shared dicts are dumped as yaml aliases).
+    """
+    unique = {}
+    for pk, uuid, attributes in structures:
+        if uuid not in unique:
+            unique[uuid] = (pk, attributes)
+    uuids = list(unique.keys())
+    _STRUCTURE_ANALYSIS_STATS['requested'] += len(structures)
+    _STRUCTURE_ANALYSIS_STATS['deduplicated'] += len(structures) - len(uuids)
+
+    cache = get_symmetry_cache()
+    results = {}
+    if cache is not None:
+        for uuid in uuids:
+            dic = cache.get(uuid, symprec)
+            if dic is not None:
+                results[uuid] = dic
+    _STRUCTURE_ANALYSIS_STATS['cached'] += len(results)
+    uncached = [ uuid for uuid in uuids if uuid not in results ]
+    attributes = [ unique[uuid][1] for uuid in uncached ]
+    symprecs = [ symprec ] * len(uncached)
+    if workers is not None and workers > 1 and len(uncached) > 1:
+        # spawn, not fork, because aiida profile and database connection
+        # are loaded in this process
+        with ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            analyzed = list(executor.map(_analyze_attributes,
+                                         attributes,
+                                         symprecs))
+    else:
+        analyzed = list(map(_analyze_attributes, attributes, symprecs))
+    _STRUCTURE_ANALYSIS_STATS['analyzed'] += len(uncached)
+    for uuid, dic in zip(uncached, analyzed):
+        if cache is not None:
+            cache.set(uuid, symprec, dic)
+        results[uuid] = dic
+
+    for uuid in uuids:
+        results[uuid]['pk'] = unique[uuid][0]
+        results[uuid]['data_type'] = 'StructureData'
+    returned = set()
+    structure_data = []
+    for _, uuid, _ in structures:
+        if uuid in returned:
+            structure_data.append(deepcopy(results[uuid]))
+        else:
+            structure_data.append(results[uuid])
+            returned.add(uuid)
+    return structure_data
+
+def _query_links(pks:list, labels:list, direction:str) -> dict:
+    """
+    get linked data of many nodes with one query
+
+    Args:
+        pks (list): workchain pks
+        labels (list): link labels to fetch
+        direction (str): 'inputs' or 'outputs'
+
+    Returns:
+        dict: {pk: {label: {'pk': data pk,
+                            'uuid': data uuid,
+                            'attributes': data attributes}}}
+    """
+    qb = QueryBuilder()
+    qb.append(Node, filters={'id': {'in': pks}}, project=['id'], tag='node')
+    if direction == 'inputs':
+        relationship = {'with_outgoing': 'node'}
+    else:
+        relationship = {'with_incoming': 'node'}
+    qb.append(Data,
+              project=['id', 'uuid', 'attributes'],
+              edge_filters={'label': {'in': labels}},
+              edge_project=['label'],
+              edge_tag='link',
+              tag='data',
+              **relationship)
+    links = { pk: {} for pk in pks }
+    for row in qb.iterdict():
+        links[row['node']['id']][row['link']['label']] = {
+                'pk': row['data']['id'],
+                'uuid': row['data']['uuid'],
+                'attributes': row['data']['attributes'],
+                }
+    return links
+
+VASP_DATA_KEYS = ['data_type', 'pk', 'incar', 'parser_settings',
+                  'potential_family', 'potential_mapping', 'kpoints',
+                  'structure', 'maximum_force', 'maximum_stress',
+                  'energy_no_entropy']
+
+class LazyVaspData(Mapping):
+    """
+    vasp data whose sections are evaluated on first access
+
+    The keys are the same as the dict returned by 'get_vasp_data'.
+    Inputs and outputs are queried only when some section needs them,
+    and structure analysis runs only when 'structure' is accessed,
+    so reading 'energy_no_entropy' costs one query.
+    """
+    def __init__(self,
+                 pk,
+                 symprec:float=1e-5,
+                 inputs:dict=None,
+                 outputs:dict=None,
+                 structures:dict=None):
+        """
+        Args:
+            pk: VaspWorkChain pk
+            symprec (float): symprec
+            inputs (dict): prefetched inputs, see '_query_links'
+            outputs (dict): prefetched outputs, see '_query_links'
+            structures (dict): prefetched {structure pk: structure data}
+        """
+        self.pk = pk
+        self.symprec = symprec
+        self._inputs = inputs
+        self._outputs = outputs
+        self._structures = structures
+        self._data = {}
+
+    @property
+    def inputs(self):
+        if self._inputs is None:
+            self._inputs = \
+                    _query_links([self.pk], VASP_INPUT_LABELS, 'inputs')[self.pk]
+        return self._inputs
+
+    @property
+    def outputs(self):
+        if self._outputs is None:
+            self._outputs = \
+                    _query_links([self.pk], VASP_OUTPUT_LABELS, 'outputs')[self.pk]
+        return self._outputs
+
+    def __getitem__(self, key):
+        if key not in self._data:
+            if key not in VASP_DATA_KEYS:
+                raise KeyError(key)
+            self._data[key] = self._get_section(key)
+        return self._data[key]
+
+    def __contains__(self, key):
+        # Mapping.__contains__ evaluates the section
+        return key in VASP_DATA_KEYS
+
+    def __iter__(self):
+        return iter(VASP_DATA_KEYS)
+
+    def __len__(self):
+        return len(VASP_DATA_KEYS)
+
+    def materialize(self) -> dict:
+        """
+        evaluate all sections and get plain dict
+        """
+        return { key: self[key] for key in self }
+
+    def _get_section(self, key):
+        if key == 'data_type':
+            return 'VaspWorkChain'
+        elif key == 'pk':
+            return self.pk
+        elif key == 'incar':
+            return self.inputs['parameters']['attributes']
+        elif key == 'parser_settings':
+            return self.inputs['settings']['attributes']['parser_settings']
+        elif key == 'potential_family':
+            return self.inputs['potential_family']['attributes']['value']
+        elif key == 'potential_mapping':
+            return self.inputs['potential_mapping']['attributes']
+        elif key == 'kpoints':
+            return self._get_kpoints()
+        elif key == 'structure':
+            return self._get_structure()
+        elif key == 'maximum_force':
+            return self.outputs['misc']['attributes']['maximum_force']
+        elif key == 'maximum_stress':
+            return self.outputs['misc']['attributes']['maximum_stress']
+        else:
+            return self.outputs['misc']['attributes'] \
+                    ['total_energies']['energy_no_entropy']
+
+    def _get_structure(self) -> dict:
+        links = {'initial': self.inputs['structure']}
+        if 'structure' in self.outputs:
+            links['final'] = self.outputs['structure']
+        else:
+            warnings.warn("final structure does not exist")
+        if self._structures is None:
+            structure_data = get_structure_data_many(
+                    [ (link['pk'], link['uuid'], link['attributes'])
+                          for link in links.values() ],
+                    symprec=self.symprec)
+            return dict(zip(links.keys(), structure_data))
+        # prefetched data are shared by nodes (the final structure of
+        # a step is the initial structure of the next step), copy them
+        # so that outputs do not share dicts
+        return { key: deepcopy(self._structures[link['pk']])
+                     for key, link in links.items() }
+
+    def _get_kpoints(self) -> dict:
+        # kpoints = get_kpoints(
+        #         structure=load_node(initial_structure_pk).get_pymatgen_structure(),
+        #         mesh=node.inputs.kpoints.get_kpoints_mesh()[0],
+        #         )
+        from twinpy.common.kpoints import get_mesh_offset_from_direct_lattice
+        mesh = self.inputs['kpoints']['attributes']['mesh']
+        offset = self.inputs['kpoints']['attributes']['offset']
+        kpt = get_mesh_offset_from_direct_lattice(
+                lattice=np.array(
+                    self.inputs['structure']['attributes']['cell']),
+                mesh=mesh)
+        kpt['offset'] = list(offset)
+        kpt['abc'] = kpt['abc'].tolist()
+        kpt['intervals'] = kpt['intervals'].tolist()
+        kpt['mesh'] = kpt['mesh'].tolist()
+        del kpt['is_hexagonal']
+        # kpoints['intervals'] = kpoints['intervals'].tolist()
+        return kpt
+
+def get_vasp_data_bulk(pks:list,
+                       symprec:float=1e-5,
+                       workers:int=None) -> dict:
+    """
+    get vasp data of many VaspWorkChain pks at once
+
+    Args:
+        pks (list): VaspWorkChain pks
+        symprec (float): symprec
+        workers (int): number of processes for structure analysis,
+                       see 'get_structure_data_many'
+
+    Returns:
+        dict: {pk: vasp data}, each vasp data is the same as 'get_vasp_data'
+
+    Note:
+        - Inputs and outputs of all nodes are fetched with two queries
+          projecting attributes only, so no node is loaded.
+        - symprec=1e-5 (default), which is the same as VASP SYMPREC default
+    """
+    inputs = _query_links(pks, VASP_INPUT_LABELS, 'inputs')
+    outputs = _query_links(pks, VASP_OUTPUT_LABELS, 'outputs')
+    structure_links = []
+    for pk in pks:
+        structure_links.append(inputs[pk]['structure'])
+        if 'structure' in outputs[pk]:
+            structure_links.append(outputs[pk]['structure'])
+    structure_data = get_structure_data_many(
+            [ (link['pk'], link['uuid'], link['attributes'])
+                  for link in structure_links ],
+            symprec=symprec,
+            workers=workers)
+    structures = { link['pk']: data
+                       for link, data in zip(structure_links, structure_data) }
+    return { pk: LazyVaspData(pk,
+                              symprec=symprec,
+                              inputs=inputs[pk],
+                              outputs=outputs[pk],
+                              structures=structures).materialize()
+                 for pk in pks }
+
+def get_vasp_data(pk, symprec=1e-5, lazy=False):
     """
     get vasp data from pk
 
+    Args:
+        lazy (bool): if True, return LazyVaspData whose sections are
+                     evaluated on first access, call its 'materialize'
+                     to get the same dict as lazy=False
+
     Note:
         - symprec=1e-5 (default), which is the same as VASP SYMPREC default
         - Warning: final structure does not exist
     """
     node = get_node_from_pk(pk)
     check_process_class(node, 'VaspWorkChain')
-    results = node.outputs.misc.get_dict()
-
-    structure = {}
-    initial_structure_pk = node.inputs.structure.pk
-    initial_structure = get_structure_data(initial_structure_pk,
-                                           symprec=symprec)
-    structure['initial'] = initial_structure
-    try:
-        final_structure_pk = node.outputs.structure.pk
-        final_structure = get_structure_data(final_structure_pk,
-                                             symprec=symprec)
-        structure['final'] = final_structure
-    except exceptions.NotExistent:
-        warnings.warn("final structure does not exist")
-
-    # kpoints = get_kpoints(
-    #         structure=load_node(initial_structure_pk).get_pymatgen_structure(),
-    #         mesh=node.inputs.kpoints.get_kpoints_mesh()[0],
-    #         )
-    mesh, offset = node.inputs.kpoints.get_kpoints_mesh()
-    kpt = get_mesh_offset_from_direct_lattice(
-            lattice=np.array(initial_structure['lattice']),
-            mesh=mesh)
-    kpt['offset'] = list(offset)
-    kpt['abc'] = kpt['abc'].tolist()
-    kpt['intervals'] = kpt['intervals'].tolist()
-    kpt['mesh'] = kpt['mesh'].tolist()
-    del kpt['is_hexagonal']
-    # kpoints['intervals'] = kpoints['intervals'].tolist()
-
-    dic = {}
-    dic['data_type'] = node.process_class.get_name()
-    dic['pk'] = pk
-    dic['incar'] = node.inputs.parameters.get_dict()
-    dic['parser_settings'] = node.inputs.settings.get_dict()['parser_settings']
-    dic['potential_family'] = node.inputs.potential_family.value
-    dic['potential_mapping'] = node.inputs.potential_mapping.get_dict()
-    dic['kpoints'] = kpt
-    dic['structure'] = structure
-    dic['maximum_force'] = results['maximum_force']
-    dic['maximum_stress'] = results['maximum_stress']
-    dic['energy_no_entropy'] = results['total_energies']['energy_no_entropy']
+    if lazy:
+        return LazyVaspData(pk, symprec=symprec)
+    return get_vasp_data_bulk([pk], symprec=symprec)[pk]
 
-    return dic
+def _get_relax_vasp_pks(pk) -> list:
+    """
+    get VaspWorkChain pks called by RelaxWorkChain in calculation order
 
-def get_relax_data(pk, symprec=1e-5) -> dict:
+    Note:
+        RelaxWorkChain calls VerifyWorkChain which calls VaspWorkChain.
+        The relax -> verify -> vasp chain is resolved with one query.
+    """
+    qb = QueryBuilder()
+    qb.append(WorkChainNode, filters={'id': {'==': pk}}, tag='relax')
+    qb.append(WorkChainNode,
+              with_incoming='relax',
+              edge_filters={'type': LinkType.CALL_WORK.value},
+              project=['id'],
+              tag='verify')
+    qb.append(WorkChainNode,
+              with_incoming='verify',
+              filters={'process_type': {'==': VASP_PROCESS_TYPE}},
+              edge_filters={'type': LinkType.CALL_WORK.value},
+              project=['id'],
+              tag='vasp')
+    qb.order_by({'verify': {'ctime': 'asc'}, 'vasp': {'ctime': 'asc'}})
+    vasp_pks = []
+    verify_pks = []
+    for verify_pk, vasp_pk in qb.all():
+        if verify_pk not in verify_pks:
+            verify_pks.append(verify_pk)
+            vasp_pks.append(vasp_pk)
+    return vasp_pks
+
+def get_relax_data(pk, symprec=1e-5, workers=None) -> dict:
     """
     get relax data from pk
 
+    Args:
+        workers (int): number of processes for structure analysis
+
     Note:
         - symprec=1e-5 (default), which is the same as VASP SYMPREC default
         - Warning: final vasp calculation is not static calc
+        - All vasp steps are fetched by 'get_vasp_data_bulk'
     """
     node = get_node_from_pk(pk)
     check_process_class(node, 'RelaxWorkChain')
 
     # drop final static calculation
-    vasp_pks = [ vasp_node.called[0].pk for vasp_node in node.called ]
-    vasp_pks.reverse()
-    if 'nsw' not in \
-            get_node_from_pk(vasp_pks[-1]).inputs.parameters.get_dict().keys():
+    vasp_pks = _get_relax_vasp_pks(pk)
+    all_vasp_results = get_vasp_data_bulk(vasp_pks,
+                                          symprec=symprec,
+                                          workers=workers)
+    if 'nsw' not in all_vasp_results[vasp_pks[-1]]['incar'].keys():
         del vasp_pks[-1]
     else:
         warnings.warn("final vasp calculation is not static calc")
     vasp_results = {}
     for i, vasp_pk in enumerate(vasp_pks):
-        vasp_results['step_%02d' % i] = get_vasp_data(vasp_pk,
-                                                           symprec=symprec)
+        vasp_results['step_%02d' % i] = all_vasp_results[vasp_pk]
 
     dic = {}
     dic['data_type'] = node.process_class.get_name()
@@ -189,9 +664,21 @@ def get_relax_data(pk, symprec=1e-5) -> dict:
 
     return dic
 
-def get_phonon_data(pk, get_phonon=False):
+def get_phonon_data(pk, get_phonon=False, workers=None):
     """
     get phonon object from aiida pk
+
+    Args:
+        workers (int): number of processes for structure analysis
+
+    Note:
+        If get_phonon=True, force constants are cached by force_sets uuid
+        and supercell / primitive matrices, and cached force constants
+        are loaded as copy on write memory mapped array,
+        see aiidaplus.cache.ArrayCache.
+        Then force constants of returned phonon are backed by the cache
+        file, but in place changes by phonopy (such as symmetrization)
+        are not written to the file.
     """
     node = load_node(pk)
     symprec = node.inputs.symmetry_tolerance.value
@@ -201,13 +688,19 @@ def get_phonon_data(pk, get_phonon=False):
     dic['calculator_settings'] = node.inputs.calculator_settings.get_dict()
     dic['symmetry_tolerance'] = symprec
     dic['phonon_setting_info'] = node.outputs.phonon_setting_info.get_dict()
-    dic['structure'] = {
-            'input': get_structure_data(node.inputs.structure.pk, symprec),
-            'primitive': get_structure_data(node.outputs.primitive.pk, symprec),
-            'supercell': get_structure_data(node.outputs.supercell.pk, symprec),
-            }
+    structure_nodes = [ node.inputs.structure,
+                        node.outputs.primitive,
+                        node.outputs.supercell ]
+    structure_data = get_structure_data_many(
+            [ (n.pk, n.uuid, n.attributes) for n in structure_nodes ],
+            symprec=symprec,
+            workers=workers)
+    dic['structure'] = dict(zip(['input', 'primitive', 'supercell'],
+                                structure_data))
 
     if get_phonon:
+        from pymatgen.io.phonopy import get_phonopy_structure
+        from phonopy import Phonopy
         pmgstructure = node.inputs.structure.get_pymatgen()
         unitcell = get_phonopy_structure(pmgstructure)
         phonon_settings = node.outputs.phonon_setting_info.get_dict()
@@ -215,57 +708,148 @@ def get_phonon_data(pk, get_phonon=False):
                          supercell_matrix=phonon_settings['supercell_matrix'],
                          primitive_matrix=phonon_settings['primitive_matrix'])
         phonon.set_displacement_dataset(phonon_settings['displacement_dataset'])
-        phonon.set_forces(node.outputs.force_sets.get_array('force_sets'))
-        phonon.produce_force_constants()
+        force_sets = node.outputs.force_sets
+        phonon.set_forces(force_sets.get_array('force_sets'))
+        cache = get_force_constants_cache()
+        key = get_force_constants_key(force_sets.uuid,
+                                      phonon_settings['supercell_matrix'],
+                                      phonon_settings['primitive_matrix'])
+        force_constants = None
+        if cache is not None:
+            # phonopy changes force constants in place (symmetrization),
+            # which crashes with read only memory mapped array
+            force_constants = cache.get(key, mmap_mode='c')
+        if force_constants is None:
+            with record('force_constants'):
+                phonon.produce_force_constants()
+            if cache is not None:
+                cache.set(key, phonon.get_force_constants())
+        else:
+            phonon.set_force_constants(force_constants)
         return dic, phonon
     else:
         return dic
 
-def get_shear_data(pk):
+def _query_children_and_outputs(pks:list, output_labels:list) -> dict:
+    """
+    get called workchains and output data of many workchains with one query
+
+    Args:
+        pks (list): workchain pks
+        output_labels (list): link labels of outputs to fetch
+
+    Returns:
+        dict: {pk: {'children': [(label, pk, process_type), ...],
+                    'outputs': {label: {'pk', 'uuid', 'attributes'}}}},
+              children are sorted by label
+    """
+    qb = QueryBuilder()
+    qb.append(WorkChainNode, filters={'id': {'in': pks}}, project=['id'],
+              tag='wf')
+    qb.append(Node,
+              with_incoming='wf',
+              edge_filters={'or': [
+                  {'type': LinkType.CALL_WORK.value},
+                  {'type': LinkType.RETURN.value,
+                   'label': {'in': output_labels}},
+                  ]},
+              edge_project=['label', 'type'],
+              edge_tag='link',
+              project=['id', 'uuid', 'label', 'process_type', 'attributes'],
+              tag='child')
+    nodes = { pk: {'children': [], 'outputs': {}} for pk in pks }
+    for row in qb.iterdict():
+        child = row['child']
+        if row['link']['type'] == LinkType.CALL_WORK.value:
+            nodes[row['wf']['id']]['children'].append(
+                    (child['label'], child['id'], child['process_type']))
+        else:
+            nodes[row['wf']['id']]['outputs'][row['link']['label']] = {
+                    'pk': child['id'],
+                    'uuid': child['uuid'],
+                    'attributes': child['attributes'],
+                    }
+    for pk in pks:
+        nodes[pk]['children'].sort(key=lambda x: x[0])
+    return nodes
+
+def _get_children_pks(children:list, process_type:str) -> list:
+    return [ child[1] for child in children if child[2] == process_type ]
+
+def get_shear_data_bulk(pks:list, workers:int=None) -> dict:
+    """
+    get shear data of many ShearWorkChain pks at once
+
+    Args:
+        pks (list): ShearWorkChain pks
+        workers (int): number of processes for structure analysis,
+                       see 'get_structure_data_many'
+
+    Returns:
+        dict: {pk: shear data}, each shear data is the same as
+              'get_shear_data'
+
+    Note:
+        Called workchains and outputs of all nodes are fetched with one
+        query, and inputs with another query.
+    """
+    nodes = _query_children_and_outputs(pks, SHEAR_OUTPUT_LABELS)
+    inputs = _query_links(pks, SHEAR_INPUT_LABELS, 'inputs')
+    parents = get_structure_data_many(
+            [ (nodes[pk]['outputs']['parent']['pk'],
+               nodes[pk]['outputs']['parent']['uuid'],
+               nodes[pk]['outputs']['parent']['attributes'])
+                  for pk in pks ],
+            workers=workers)
+
+    results = {}
+    for pk, parent in zip(pks, parents):
+        outputs = nodes[pk]['outputs']
+        children = nodes[pk]['children']
+        dic = {}
+        dic['pk'] = pk
+        dic['calculator_settings'] = \
+                inputs[pk]['calculator_settings']['attributes']
+        dic['shear_conf'] = inputs[pk]['shear_conf']['attributes']
+        dic['parent'] = parent
+        dic['relax_results'] = outputs['relax_results']['attributes']
+        dic['shear_ratios'] = \
+                outputs['shear_ratios']['attributes']['shear_ratios']
+        dic['gamma'] = outputs['gamma']['attributes']['value']
+        dic['relax_pks'] = _get_children_pks(children, RELAX_PROCESS_TYPE)
+        dic['phonon_pks'] = _get_children_pks(children, PHONOPY_PROCESS_TYPE)
+        results[pk] = dic
+
+    return results
+
+def get_shear_data(pk, workers=None):
     """
     get shear data
     """
-    # get called pks
-    node = load_node(pk)
-    rlx_qb = QueryBuilder()
-    rlx_qb.append(Node, filters={'id':{'==': pk}}, tag='wf')
-    rlx_qb.append(RELAX_WF, with_incoming='wf', project=['label', 'id'])
-    ph_qb = QueryBuilder()
-    ph_qb.append(Node, filters={'id':{'==': pk}}, tag='wf')
-    ph_qb.append(PHONOPY_WF, with_incoming='wf', project=['label', 'id'])
-    relaxes = rlx_qb.all()
-    relaxes.sort(key=lambda x: x[0])
-    phonons = ph_qb.all()
-    phonons.sort(key=lambda x: x[0])
+    return get_shear_data_bulk([pk], workers=workers)[pk]
 
-    dic = {}
-    dic['pk'] = pk
-    dic['calculator_settings'] = node.inputs.calculator_settings.get_dict()
-    dic['shear_conf'] = node.inputs.shear_conf.get_dict()
-    dic['parent'] = get_structure_data(node.outputs.parent.pk)
-    dic['relax_results'] = node.outputs.relax_results.get_dict()
-    dic['shear_ratios'] = node.outputs.shear_ratios.get_dict()['shear_ratios']
-    dic['gamma'] = node.outputs.gamma.value
-    dic['relax_pks'] = np.array(relaxes)[:,1].astype(int).tolist()
-    dic['phonon_pks'] = np.array(phonons)[:,1].astype(int).tolist()
+def get_twinboundary_relax_data_bulk(pks:list) -> dict:
+    """
+    get twinboundary relax data of many pks at once
 
-    return dic
+    Returns:
+        dict: {pk: twinboundary relax data}
+    """
+    nodes = _query_children_and_outputs(pks, [])
+    results = {}
+    for pk in pks:
+        dic = {}
+        dic['relax_pks'] = _get_children_pks(nodes[pk]['children'],
+                                             RELAX_PROCESS_TYPE)
+        dic['relax_pks'].sort()
+        results[pk] = dic
+    return results
 
 def get_twinboundary_relax_data(pk):
     """
     Get twinboudnary relax data.
     """
-    # get called pks
-    node = load_node(pk)
-    rlx_qb = QueryBuilder()
-    rlx_qb.append(Node, filters={'id':{'==': pk}}, tag='wf')
-    rlx_qb.append(RELAX_WF, with_incoming='wf', project=['label', 'id'])
-    relaxes = rlx_qb.all()
-    dic = {}
-    dic['relax_pks'] = [ relax[1] for relax in relaxes ]
-    dic['relax_pks'].sort()
-
-    return dic
+    return get_twinboundary_relax_data_bulk([pk])[pk]
 
 # def get_twinboundary_data(pk):
 #     """
@@ -0,0 +1,470 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+io
+--
+read and write exported data
+
+Binary formats ('npz', 'hdf5', 'parquet') store numeric arrays in exported
+data as native typed arrays, and the other fields (scalars, strings,
+lists of strings, ...) as a table. h5py and pyarrow are required only for
+'hdf5' and 'parquet'.
+
+YAML is loaded and dumped with 'CSafeLoader' and 'CSafeDumper' if PyYAML
+is built with libyaml, otherwise with pure Python 'SafeLoader' and
+'SafeDumper'. numpy arrays and scalars are dumped as plain lists and numbers.
+
+Phonopy force constants, force sets and displacements are saved as raw
+'.npy' arrays with small 'metadata.json' by 'save_phonon_arrays',
+and loaded as memory-mapped arrays by 'load_phonon_arrays'.
+Phonopy band structures, with eigenvectors if calculated, are saved
+by 'save_band_structure' with npz or hdf5.
+"""
+
+import os
+import json
+import yaml
+import numpy as np
+try:
+    from yaml import CSafeLoader as YamlLoader, CSafeDumper as _YamlDumper
+except ImportError:
+    from yaml import SafeLoader as YamlLoader, SafeDumper as _YamlDumper
+
+BINARY_FORMATS = ['npz', 'hdf5', 'parquet']
+EXTENSIONS = {
+        'yaml': '.yaml',
+        'npz': '.npz',
+        'hdf5': '.h5',
+        'parquet': '.parquet',
+        }
+_SEP = '/'
+_FORMAT_VERSION = 1
+PHONON_ARRAYS = ['force_constants', 'force_sets', 'displacements']
+
+
+def _json_default(obj):
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    raise TypeError("object of type %s is not JSON serializable"
+                    % type(obj).__name__)
+
+
+class YamlDumper(_YamlDumper):
+    """
+    safe dumper which also represents numpy arrays and scalars
+    """
+
+
+YamlDumper.add_representer(
+        np.ndarray,
+        lambda dumper, array: dumper.represent_list(array.tolist()))
+YamlDumper.add_multi_representer(
+        np.generic,
+        lambda dumper, value: dumper.represent_data(value.item()))
+
+
+def load_yaml(filename:str):
+    """
+    load yaml file with libyaml if available
+
+    Args:
+        filename (str): yaml file
+    """
+    with open(filename) as f:
+        return yaml.load(f, Loader=YamlLoader)
+
+
+def dump_yaml(dic:dict, filename:str, **kwargs):
+    """
+    dump yaml file with libyaml if available
+
+    Args:
+        dic (dict): data
+        filename (str): yaml file
+        kwargs: passed to 'yaml.dump', default: indent=4,
+                default_flow_style=False
+    """
+    kwargs.setdefault('indent', 4)
+    kwargs.setdefault('default_flow_style', False)
+    with open(filename, 'w') as f:
+        yaml.dump(dic, f, Dumper=YamlDumper, **kwargs)
+
+
+def _to_array(value) -> np.ndarray:
+    """
+    get numeric array from value, None if value is not numeric array
+    """
+    if not isinstance(value, (list, tuple, np.ndarray)) or len(value) == 0:
+        return None
+    try:
+        array = np.asarray(value)
+    except ValueError:
+        # ragged list
+        return None
+    if array.dtype.kind not in 'biuf':
+        return None
+    return array
+
+
+def split_data(dic:dict) -> tuple:
+    """
+    split nested dict into fields and numeric arrays
+
+    Args:
+        dic (dict): exported data
+
+    Returns:
+        tuple: (scalars, arrays), both are dict whose keys are the path
+               of nested keys joined with '/'
+    """
+    scalars = {}
+    arrays = {}
+
+    def _split(d, prefix):
+        for key, value in d.items():
+            path = prefix + str(key)
+            if isinstance(value, dict) and len(value) > 0:
+                _split(value, path + _SEP)
+                continue
+            array = _to_array(value)
+            if array is None:
+                scalars[path] = value
+            else:
+                arrays[path] = array
+
+    _split(dic, '')
+    return (scalars, arrays)
+
+
+def join_data(scalars:dict, arrays:dict, as_list:bool=False) -> dict:
+    """
+    join fields and numeric arrays into nested dict, inverse of 'split_data'
+
+    Args:
+        scalars (dict): fields
+        arrays (dict): numeric arrays
+        as_list (bool): if True, arrays are converted to list,
+                        which is the same as loaded from yaml
+
+    Note:
+        Keys of nested dict are always str.
+    """
+    dic = {}
+    items = list(scalars.items())
+    if as_list:
+        items.extend([ (path, array.tolist())
+                           for path, array in arrays.items() ])
+    else:
+        items.extend(arrays.items())
+    for path, value in items:
+        keys = path.split(_SEP)
+        d = dic
+        for key in keys[:-1]:
+            d = d.setdefault(key, {})
+        d[keys[-1]] = value
+    return dic
+
+
+def _save_npz(scalars, arrays, filename):
+    paths = list(arrays.keys())
+    meta = {'version': _FORMAT_VERSION, 'scalars': scalars, 'arrays': paths}
+    named_arrays = { 'array_%d' % i: arrays[path]
+                         for i, path in enumerate(paths) }
+    np.savez(filename,
+             __meta__=np.array(json.dumps(meta, default=_json_default)),
+             **named_arrays)
+
+
+def _load_npz(filename):
+    with np.load(filename, allow_pickle=False) as npz:
+        meta = json.loads(str(npz['__meta__']))
+        arrays = { path: npz['array_%d' % i]
+                       for i, path in enumerate(meta['arrays']) }
+    return (meta['scalars'], arrays)
+
+
+def _save_hdf5(scalars, arrays, filename):
+    import h5py
+    paths = list(arrays.keys())
+    with h5py.File(filename, 'w') as f:
+        f.attrs['__meta__'] = json.dumps(
+                {'version': _FORMAT_VERSION,
+                 'scalars': scalars,
+                 'arrays': paths},
+                default=_json_default)
+        for i, path in enumerate(paths):
+            f.create_dataset('array_%d' % i, data=arrays[path])
+
+
+def _load_hdf5(filename):
+    import h5py
+    with h5py.File(filename, 'r') as f:
+        meta = json.loads(f.attrs['__meta__'])
+        arrays = { path: f['array_%d' % i][()]
+                       for i, path in enumerate(meta['arrays']) }
+    return (meta['scalars'], arrays)
+
+
+def _save_parquet(scalars, arrays, filename):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    columns = {}
+    others = {}
+    for path, value in scalars.items():
+        if isinstance(value, (bool, int, float, str)):
+            columns[path] = pa.array([value])
+        else:
+            others[path] = value
+    shapes = {}
+    for path, array in arrays.items():
+        columns[path] = pa.array([array.ravel()])
+        shapes[path] = list(array.shape)
+    meta = {'version': _FORMAT_VERSION, 'scalars': others, 'shapes': shapes}
+    table = pa.table(columns)
+    table = table.replace_schema_metadata(
+            {'aiidaplus': json.dumps(meta, default=_json_default)})
+    pq.write_table(table, filename)
+
+
+def _load_parquet(filename):
+    import pyarrow.parquet as pq
+    table = pq.read_table(filename)
+    meta = json.loads(table.schema.metadata[b'aiidaplus'])
+    scalars = dict(meta['scalars'])
+    arrays = {}
+    for name in table.column_names:
+        column = table.column(name)
+        if name in meta['shapes']:
+            values = column.chunk(0).values.to_numpy(zero_copy_only=False)
+            arrays[name] = values.reshape(meta['shapes'][name])
+        else:
+            scalars[name] = column[0].as_py()
+    return (scalars, arrays)
+
+
+_SAVERS = {'npz': _save_npz, 'hdf5': _save_hdf5, 'parquet': _save_parquet}
+_LOADERS = {'.npz': _load_npz,
+            '.h5': _load_hdf5,
+            '.hdf5': _load_hdf5,
+            '.parquet': _load_parquet}
+
+
+def save_data(dic:dict, filename:str, fmt:str):
+    """
+    save exported data with binary format
+
+    Args:
+        dic (dict): exported data
+        filename (str): output file name
+        fmt (str): 'npz', 'hdf5' or 'parquet'
+
+    Raises:
+        ValueError: fmt is not supported
+    """
+    if fmt not in _SAVERS:
+        raise ValueError("format %s is not supported" % fmt)
+    scalars, arrays = split_data(dic)
+    _SAVERS[fmt](scalars, arrays, filename)
+
+
+def write_data(dic:dict, filename:str):
+    """
+    write exported data, format is detected by extension
+
+    Args:
+        dic (dict): exported data
+        filename (str): '.yaml', '.json', '.npz', '.h5', '.hdf5'
+                        or '.parquet' file
+
+    Raises:
+        ValueError: extension is not supported
+    """
+    ext = os.path.splitext(filename)[1]
+    if ext in ['.yaml', '.yml']:
+        dump_yaml(dic, filename, explicit_start=True)
+    elif ext == '.json':
+        with open(filename, 'w') as f:
+            json.dump(dic, f, indent=4, default=_json_default)
+    elif ext in _LOADERS:
+        fmts = { EXTENSIONS[fmt]: fmt for fmt in BINARY_FORMATS }
+        fmts['.hdf5'] = 'hdf5'
+        save_data(dic, filename, fmts[ext])
+    else:
+        raise ValueError("extension %s is not supported" % ext)
+
+
+def load_data(filename:str, as_list:bool=False) -> dict:
+    """
+    load exported data, format is detected by extension
+
+    Args:
+        filename (str): '.yaml', '.json', '.npz', '.h5', '.hdf5'
+                        or '.parquet' file
+        as_list (bool): if True, numeric arrays in binary formats are
+                        converted to list, which is the same as yaml
+
+    Raises:
+        ValueError: extension is not supported
+    """
+    ext = os.path.splitext(filename)[1]
+    if ext in ['.yaml', '.yml']:
+        return load_yaml(filename)
+    if ext == '.json':
+        with open(filename) as f:
+            return json.load(f)
+    if ext not in _LOADERS:
+        raise ValueError("extension %s is not supported" % ext)
+    scalars, arrays = _LOADERS[ext](filename)
+    return join_data(scalars, arrays, as_list=as_list)
+
+
+def is_supported_file(filename:str) -> bool:
+    """
+    check file can be loaded by 'load_data'
+    """
+    ext = os.path.splitext(filename)[1]
+    return ext in ['.yaml', '.yml', '.json'] or ext in _LOADERS
+
+
+def save_phonon_arrays(phonon, dirname:str, metadata:dict=None):
+    """
+    save force constants, force sets and displacements of phonopy object
+    as '.npy' arrays
+
+    Args:
+        phonon: phonopy object with displacement dataset and
+                force constants
+        dirname (str): output directory, which contains
+                       'force_constants.npy', 'force_sets.npy' (ndisp, natom, 3),
+                       'displacements.npy' (ndisp, 3) and 'metadata.json'
+        metadata (dict): additional metadata such as node pk
+
+    Note:
+        Displaced atom indices in supercell are stored in metadata as
+        'displaced_atoms', so that phonopy displacement dataset can be
+        reconstructed.
+    """
+    os.makedirs(dirname, exist_ok=True)
+    dataset = phonon.get_displacement_dataset()
+    unitcell = phonon.get_unitcell()
+    arrays = {
+        'force_constants': np.array(phonon.get_force_constants()),
+        'force_sets': np.array([ disp['forces']
+                                     for disp in dataset['first_atoms'] ]),
+        'displacements': np.array([ disp['displacement']
+                                        for disp in dataset['first_atoms'] ]),
+        }
+    meta = {
+        'version': _FORMAT_VERSION,
+        'unitcell': {
+            'lattice': unitcell.get_cell(),
+            'scaled_positions': unitcell.get_scaled_positions(),
+            'symbols': unitcell.get_chemical_symbols(),
+            'masses': unitcell.get_masses(),
+            },
+        'supercell_matrix': phonon.get_supercell_matrix(),
+        'primitive_matrix': phonon.get_primitive_matrix(),
+        'natom': dataset['natom'],
+        'displaced_atoms': [ disp['number']
+                                 for disp in dataset['first_atoms'] ],
+        'arrays': { name: {'shape': list(array.shape),
+                           'dtype': str(array.dtype)}
+                        for name, array in arrays.items() },
+        }
+    if metadata is not None:
+        meta.update(metadata)
+    for name, array in arrays.items():
+        np.save(os.path.join(dirname, name+'.npy'), array)
+    with open(os.path.join(dirname, 'metadata.json'), 'w') as f:
+        json.dump(meta, f, indent=4, default=_json_default)
+
+
+def load_phonon_arrays(dirname:str, mmap_mode:str='r') -> dict:
+    """
+    load arrays saved by 'save_phonon_arrays'
+
+    Args:
+        dirname (str): directory
+        mmap_mode (str): passed to 'np.load', if None, arrays are read
+                         into memory
+
+    Returns:
+        dict: metadata and arrays, 'force_constants', 'force_sets'
+              and 'displacements'
+    """
+    with open(os.path.join(dirname, 'metadata.json')) as f:
+        data = json.load(f)
+    for name in PHONON_ARRAYS:
+        data[name] = np.load(os.path.join(dirname, name+'.npy'),
+                             mmap_mode=mmap_mode)
+    return data
+
+
+def save_band_structure(band_structure, filename:str):
+    """
+    save phonopy band structure with binary format
+
+    Args:
+        band_structure: phonopy BandStructure
+        filename (str): '.npz', '.h5' or '.hdf5' file
+
+    Raises:
+        ValueError: extension is not supported
+
+    Note:
+        Arrays are (nsegment, npoints, ...), eigenvectors are saved
+        only if they are calculated.
+    """
+    arrays = {
+        'qpoints': np.array(band_structure.qpoints),
+        'distances': np.array(band_structure.distances),
+        'frequencies': np.array(band_structure.frequencies),
+        'path_connections': np.array(band_structure.path_connections),
+        }
+    if band_structure.eigenvectors is not None:
+        arrays['eigenvectors'] = np.array(band_structure.eigenvectors)
+    meta = json.dumps({'version': _FORMAT_VERSION,
+                       'labels': band_structure.labels},
+                      default=_json_default)
+    ext = os.path.splitext(filename)[1]
+    if ext == '.npz':
+        np.savez(filename, __meta__=np.array(meta), **arrays)
+    elif ext in ['.h5', '.hdf5']:
+        import h5py
+        with h5py.File(filename, 'w') as f:
+            f.attrs['__meta__'] = meta
+            for name, array in arrays.items():
+                f.create_dataset(name, data=array)
+    else:
+        raise ValueError("extension %s is not supported" % ext)
+
+
+def load_band_structure(filename:str) -> dict:
+    """
+    load band structure saved by 'save_band_structure'
+
+    Returns:
+        dict: 'labels', 'qpoints', 'distances', 'frequencies',
+              'path_connections' and 'eigenvectors' if saved
+
+    Raises:
+        ValueError: extension is not supported
+    """
+    ext = os.path.splitext(filename)[1]
+    if ext == '.npz':
+        with np.load(filename, allow_pickle=False) as npz:
+            data = json.loads(str(npz['__meta__']))
+            data.update({ name: npz[name] for name in npz.files
+                              if name != '__meta__' })
+    elif ext in ['.h5', '.hdf5']:
+        import h5py
+        with h5py.File(filename, 'r') as f:
+            data = json.loads(f.attrs['__meta__'])
+            data.update({ name: f[name][()] for name in f.keys() })
+    else:
+        raise ValueError("extension %s is not supported" % ext)
+    del data['version']
+    return data
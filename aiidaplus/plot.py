@@ -7,14 +7,25 @@ plot
 provide various kinds of plot
 """
 
+import weakref
+import multiprocessing
 import numpy as np
+from concurrent.futures import ProcessPoolExecutor
 from copy import deepcopy
 from matplotlib import pyplot as plt
 import mpl_toolkits.axes_grid1
 from phonopy.phonon.band_structure import BandPlot as PhonopyBandPlot
 from phonopy.phonon.dos import TotalDos as PhonopyTotalDos
+from phonopy.phonon.band_structure import BandStructure
 from phonopy.phonon.band_structure import get_band_qpoints_and_path_connections
+from phonopy.phonon.band_structure import get_band_qpoints_by_seekpath
+from phonopy.phonon.mesh import Mesh
+from phonopy.structure.grid_points import length2mesh
 from mpl_toolkits.axes_grid1 import ImageGrid
+from aiidaplus.cache import (get_phonon_cache,
+                             get_phonon_hash,
+                             get_band_key,
+                             get_dos_key)
 
 
 # plt.rcParams["font.size"] = 18
@@ -146,6 +157,25 @@ def shift_energy_plot(ax, shifts, energies, natoms, a, b, ev_range=4):
     ax.set_xlabel("y shift [angstrom]")
     ax.set_ylabel("x shift [angstrom]")
 
+def shear_plot(fig, data):
+    """
+    plot shear energy against strain
+
+    Args:
+        data (dict): shear data from aiidaplus.get_data.get_shear_data
+    """
+    ax = fig.add_subplot(111)
+    line_chart(
+            ax,
+            data['gamma'] * np.array(data['shear_ratios']),
+            (np.array(data['relax_results']['energies']) \
+                - data['relax_results']['energies'][0]) \
+                  * 1000 / data['parent']['natoms'],
+            "strain (angstrom)",
+            "energy (meV / atom)"
+            )
+    fig.suptitle('shear result pk: %s' % data['pk'])
+
 
 class TotalDosPlot(PhonopyTotalDos):
 
@@ -253,6 +283,96 @@ def _plot_total_dos(ax,
 
     ax.grid(draw_grid)
 
+_TOTAL_DOS_CACHE = weakref.WeakKeyDictionary()
+
+def _check_dynamical_matrix(phonon):
+    if phonon.dynamical_matrix is None:
+        raise RuntimeError("force constants are not set to phonon")
+
+def _run_mesh(phonon, mesh):
+    """
+    run mesh calculation without 'phonon.set_mesh'
+
+    Note:
+        Same as 'phonon.set_mesh(mesh)', but mesh object is returned
+        and 'phonon.mesh' is not changed.
+    """
+    _check_dynamical_matrix(phonon)
+    rotations = phonon.primitive_symmetry.get_pointgroup_operations()
+    if np.ndim(mesh) == 0:
+        mesh = length2mesh(mesh, phonon.primitive.cell, rotations)
+    mesh_object = Mesh(phonon.dynamical_matrix,
+                       mesh,
+                       rotations=rotations,
+                       factor=phonon.unit_conversion_factor)
+    mesh_object.run()
+    return mesh_object
+
+def get_total_dos(phonon,
+                  mesh,
+                  sigma=None,
+                  freq_min=None,
+                  freq_max=None,
+                  freq_pitch=None,
+                  use_tetrahedron_method=False) -> dict:
+    """
+    get total dos, which is computed once for each phonon and
+    (mesh, sigma, method, frequency range) and cached
+
+    Returns:
+        dict: 'frequency_points', 'dos', 'freq_Debye', 'Debye_fit_coef'
+
+    Note:
+        Phonon object is not changed ('phonon.mesh' is kept).
+        Results are cached while the phonon object is alive.
+        Call 'clear_total_dos_cache' if force constants of the phonon
+        object are changed.
+        Results are also cached on disk with the hash of force constants,
+        see aiidaplus.cache.get_phonon_cache.
+    """
+    key = (tuple(np.ravel(mesh).tolist()), sigma, use_tetrahedron_method,
+           freq_min, freq_max, freq_pitch)
+    results = _TOTAL_DOS_CACHE.setdefault(phonon, {})
+    if key in results:
+        return results[key]
+
+    cache = get_phonon_cache()
+    if cache is not None:
+        cache_key = get_dos_key(get_phonon_hash(phonon), *key)
+        array = cache.get(cache_key)
+        if array is not None:
+            # Debye frequency is not fitted in this function
+            results[key] = {
+                    'frequency_points': np.array(array[0]),
+                    'dos': np.array(array[1]),
+                    'freq_Debye': None,
+                    'Debye_fit_coef': None,
+                    }
+            return results[key]
+
+    total_dos = PhonopyTotalDos(
+            mesh_object=_run_mesh(phonon, mesh),
+            sigma=sigma,
+            use_tetrahedron_method=use_tetrahedron_method)
+    total_dos.set_draw_area(freq_min, freq_max, freq_pitch)
+    total_dos.run()
+    results[key] = {
+            'frequency_points': total_dos._frequency_points,
+            'dos': total_dos._dos,
+            'freq_Debye': total_dos._freq_Debye,
+            'Debye_fit_coef': total_dos._Debye_fit_coef,
+            }
+    if cache is not None:
+        cache.set(cache_key, np.array([total_dos._frequency_points,
+                                       total_dos._dos]))
+    return results[key]
+
+def clear_total_dos_cache():
+    """
+    clear cache of 'get_total_dos'
+    """
+    _TOTAL_DOS_CACHE.clear()
+
 def total_doses_plot(ax,
                      phonons,
                      mesh,
@@ -280,27 +400,34 @@ def total_doses_plot(ax,
     if labels is None:
         labels = [None] * len(phonons)
 
-    total_doses = []
-    for phonon in phonons:
-        phonon.set_mesh(mesh)
-        total_dos = TotalDosPlot(ax,
-                                 mesh_object=phonon.mesh,
-                                 sigma=sigma,
-                                 use_tetrahedron_method=use_tetrahedron_method)
-        total_dos.set_draw_area(freq_min, freq_max, freq_pitch)
-        total_dos.run()
-        total_doses.append(total_dos)
-
-    for i, total_dos in enumerate(total_doses):
-        total_dos.plot(ax=ax,
-                       c=cs[i],
-                       alpha=alphas[i],
-                       linewidth=linewidths[i],
-                       linestyle=linestyles[i],
-                       draw_grid=draw_grid,
-                       flip_xy=flip_xy,
-                       label=labels[i]
-                       )
+    if flip_xy:
+        xlabel, ylabel = 'Density of states', 'Frequency'
+    else:
+        xlabel, ylabel = 'Frequency', 'Density of states'
+
+    for i, phonon in enumerate(phonons):
+        total_dos = get_total_dos(phonon,
+                                  mesh,
+                                  sigma=sigma,
+                                  freq_min=freq_min,
+                                  freq_max=freq_max,
+                                  freq_pitch=freq_pitch,
+                                  use_tetrahedron_method=use_tetrahedron_method)
+        _plot_total_dos(ax,
+                        total_dos['frequency_points'],
+                        total_dos['dos'],
+                        c=cs[i],
+                        alpha=alphas[i],
+                        linewidth=linewidths[i],
+                        linestyle=linestyles[i],
+                        freq_Debye=total_dos['freq_Debye'],
+                        Debye_fit_coef=total_dos['Debye_fit_coef'],
+                        xlabel=xlabel,
+                        ylabel=ylabel,
+                        draw_grid=draw_grid,
+                        flip_xy=flip_xy,
+                        label=labels[i],
+                        )
 
 
 class BandsPlot(PhonopyBandPlot):
@@ -317,22 +444,31 @@ class BandsPlot(PhonopyBandPlot):
                  xscale=20,
                  npoints=51,
                  with_dos=False,
-                 mesh=None):
+                 mesh=None,
+                 workers=1):
         """
         band plot
+
+        Args:
+            overwrite_phonons (bool): no effect, phonons are not copied
+                                      and not changed
+            workers (int): number of processes for band calculations,
+                           if 1 (default), run in this process,
+                           if None, the number of cpus
+                           (only worth for many or large phonons,
+                           because each process imports phonopy)
         """
         self.fig = fig
-        # not working now
-        if overwrite_phonons:
-            self.phonons = phonons
-        else:
-            self.phonons = deepcopy(phonons)
+        # band structures and dos are calculated without changing phonons
+        self.phonons = phonons
         self.band_labels = None
         self.connections = None
         self.axes = None
         self.mesh = mesh
         self.with_dos = with_dos
         self.npoints = npoints
+        self.workers = workers
+        self.bands = None
         self._run_band(band_labels,
                        segment_qpoints,
                        is_auto,
@@ -363,7 +499,7 @@ class BandsPlot(PhonopyBandPlot):
         return revised
 
     def _set_axs(self):
-        n = len([x for x in self.phonons[0].band_structure.path_connections if not x])
+        n = len([x for x in self.connections if not x])
         if self.with_dos:
             n += 1
         self.axs = ImageGrid(self.fig, 111,  # similar to subplot(111)
@@ -375,24 +511,25 @@ class BandsPlot(PhonopyBandPlot):
     def _set_frame(self):
         self.decorate(self.band_labels,
                       self.connections,
-                      self.phonons[0].band_structure.get_frequencies(),
-                      self.phonons[0].band_structure.get_distances())
+                      self.bands[0][1],
+                      self.bands[0][0])
 
     def _run_band(self,
                   band_labels,
                   segment_qpoints,
                   is_auto,
                   npoints):
+        paths = []
         for i, phonon in enumerate(self.phonons):
             if i == 0:
-                _run_band_calc(phonon=phonon,
-                               band_labels=band_labels,
-                               segment_qpoints=segment_qpoints,
-                               is_auto=is_auto,
-                               npoints=npoints)
+                qpt, labels, con = _get_band_path(
+                        phonon=phonon,
+                        band_labels=band_labels,
+                        segment_qpoints=segment_qpoints,
+                        is_auto=is_auto,
+                        npoints=npoints)
+                paths.append((qpt, labels, con))
                 base_primitive_matrix = phonon.get_primitive_matrix()
-                qpt = phonon.band_structure.qpoints
-                con = phonon.band_structure.path_connections
                 segment_qpoints = []
                 l = []
                 for i in range(len(qpt)):
@@ -413,18 +550,38 @@ class BandsPlot(PhonopyBandPlot):
                                    np.dot(np.linalg.inv(base_primitive_matrix.T),
                                           segment.T)).T
                     fixed_segment_qpoints.append(fixed_segment)
-                fixed_segment_qpoints = np.array(fixed_segment_qpoints)
-                _run_band_calc(phonon=phonon,
-                               band_labels=self.phonons[0].band_structure.labels,
-                               segment_qpoints=fixed_segment_qpoints,
-                               is_auto=False,
-                               npoints=npoints)
+                paths.append(_get_band_path(
+                        phonon=phonon,
+                        band_labels=paths[0][1],
+                        segment_qpoints=np.array(fixed_segment_qpoints),
+                        is_auto=False,
+                        npoints=npoints))
+
+        # phonons are independent of each other once the path is fixed,
+        # only the bands which are not cached are calculated
+        self.bands = [ _get_cached_band(phonon, path[0])
+                           for phonon, path in zip(self.phonons, paths) ]
+        indices = [ i for i, band in enumerate(self.bands) if band is None ]
+        if self.workers == 1 or len(indices) < 2:
+            results = [ _run_band_task((self.phonons[i],) + paths[i])
+                            for i in indices ]
+        else:
+            tasks = [ (get_phonon_inputs(self.phonons[i]),) + paths[i]
+                          for i in indices ]
+            with ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context('spawn')) \
+                            as executor:
+                results = list(executor.map(_run_band_task, tasks))
+        for i, band in zip(indices, results):
+            _set_cached_band(self.phonons[i], paths[i][0], *band)
+            self.bands[i] = band
 
         if is_auto:
-            self.band_labels = self.phonons[0].band_structure.labels
+            self.band_labels = paths[0][1]
         else:
             self.band_labels = [ decorate_string_for_latex(label) for label in band_labels ]
-        self.connections = self.phonons[0].band_structure.path_connections
+        self.connections = paths[0][2]
 
     def plot_bands(self, cs=None, alphas=None, linestyles=None, linewidths=None, labels=None):
         """
@@ -464,9 +621,7 @@ class BandsPlot(PhonopyBandPlot):
         if labels is None:
             labels = [ None ] * len(self.phonons)
 
-        for i, phonon in enumerate(self.phonons):
-            distances = phonon.band_structure.get_distances()
-            frequencies = phonon.band_structure.get_frequencies()
+        for i, (distances, frequencies) in enumerate(self.bands):
             if i == 0:
                 _plot(distances, frequencies, self.connections, is_decorate=True,
                       c=cs[i], alpha=alphas[i], linestyle=linestyles[i], linewidth=linewidths[i], label=labels[i])
@@ -476,74 +631,221 @@ class BandsPlot(PhonopyBandPlot):
                 _plot(distances, frequencies, self.connections, is_decorate=False,
                       c=cs[i], alpha=alphas[i], linestyle=linestyles[i], linewidth=linewidths[i], label=labels[i])
 
-            if self.with_dos:
-                # total_doses_plot(ax=self._axs[-1],
-                #                  phonons=self.phonons,
-                #                  mesh=self.mesh,
-                #                  cs=cs,
-                #                  alphas=alphas,
-                #                  linewidths=linewidths,
-                #                  linestyles=linestyles,
-                #                  flip_xy=True,
-                #                  draw_grid=False,
-                #                  labels=labels,
-                #                  )
-                if i == 0:
-                    total_doses_plot(ax=self._axs[-1],
-                                     phonons=self.phonons,
-                                     mesh=self.mesh,
-                                     cs=cs,
-                                     alphas=alphas,
-                                     linewidths=linewidths,
-                                     linestyles=linestyles,
-                                     flip_xy=True,
-                                     draw_grid=False,
-                                     labels=labels,
-                                     )
-                    xlim = self._axs[-1].get_xlim()
-                    ylim = self._axs[-1].get_ylim()
-                    aspect = (xlim[1] - xlim[0]) / (ylim[1] - ylim[0]) * 3
-                    self._axs[-1].set_aspect(aspect)
-                    self._axs[-1].axhline(y=0, linestyle=':', linewidth=0.5, color='b')
-                    self._axs[-1].set_xlim((0, None))
-                else:
-                    total_doses_plot(ax=self._axs[-1],
-                                     phonons=self.phonons,
-                                     mesh=self.mesh,
-                                     cs=cs,
-                                     alphas=alphas,
-                                     linewidths=linewidths,
-                                     linestyles=linestyles,
-                                     flip_xy=True,
-                                     draw_grid=False,
-                                     labels=None,
-                                     )
+        if self.with_dos:
+            # dos of each phonon is plotted once after bands
+            total_doses_plot(ax=self._axs[-1],
+                             phonons=self.phonons,
+                             mesh=self.mesh,
+                             cs=cs,
+                             alphas=alphas,
+                             linewidths=linewidths,
+                             linestyles=linestyles,
+                             flip_xy=True,
+                             draw_grid=False,
+                             labels=labels,
+                             )
+            xlim = self._axs[-1].get_xlim()
+            ylim = self._axs[-1].get_ylim()
+            aspect = (xlim[1] - xlim[0]) / (ylim[1] - ylim[0]) * 3
+            self._axs[-1].set_aspect(aspect)
+            self._axs[-1].axhline(y=0, linestyle=':', linewidth=0.5, color='b')
+            self._axs[-1].set_xlim((0, None))
         self._axs[-1].legend()
 
-def _run_band_calc(phonon,
+def get_phonon_inputs(phonon) -> dict:
+    """
+    get inputs to rebuild phonon in other process, see 'build_phonon'
+    """
+    unitcell = phonon.get_unitcell()
+    return {
+        'cell': unitcell.get_cell(),
+        'scaled_positions': unitcell.get_scaled_positions(),
+        'numbers': unitcell.get_atomic_numbers(),
+        'masses': unitcell.get_masses(),
+        'supercell_matrix': phonon.get_supercell_matrix(),
+        'primitive_matrix': phonon.get_primitive_matrix(),
+        'force_constants': np.array(phonon.get_force_constants()),
+        'nac_params': phonon.get_nac_params(),
+        'factor': phonon.unit_conversion_factor,
+        'symprec': phonon.symmetry.tolerance,
+        'calculator': phonon.calculator,
+        }
+
+def build_phonon(inputs:dict):
+    """
+    build phonon from 'get_phonon_inputs'
+
+    Note:
+        Unit conversion factor, symprec and calculator are also set,
+        so frequencies are the same as the original phonon.
+    """
+    from phonopy import Phonopy
+    from phonopy.structure.atoms import PhonopyAtoms
+    unitcell = PhonopyAtoms(cell=inputs['cell'],
+                            scaled_positions=inputs['scaled_positions'],
+                            numbers=inputs['numbers'],
+                            masses=inputs['masses'])
+    phonon = Phonopy(unitcell,
+                     supercell_matrix=inputs['supercell_matrix'],
+                     primitive_matrix=inputs['primitive_matrix'],
+                     factor=inputs['factor'],
+                     symprec=inputs['symprec'],
+                     calculator=inputs['calculator'])
+    phonon.set_force_constants(inputs['force_constants'])
+    if inputs['nac_params'] is not None:
+        phonon.set_nac_params(inputs['nac_params'])
+    return phonon
+
+def _run_band_task(task) -> tuple:
+    """
+    run band calculation along path from '_get_band_path'
+
+    Args:
+        task (tuple): (phonon, qpoints, labels, path_connections),
+                      phonon can be inputs from 'get_phonon_inputs',
+                      then phonon is rebuilt in this process
+
+    Returns:
+        tuple: (distances, frequencies), only these small arrays are
+               sent back instead of phonopy object
+    """
+    phonon, qpoints, band_labels, path_connections = task
+    if isinstance(phonon, dict):
+        phonon = build_phonon(phonon)
+    band_structure = _run_band_structure(phonon=phonon,
+                                         qpoints=qpoints,
+                                         band_labels=band_labels,
+                                         path_connections=path_connections)
+    return (band_structure.get_distances(),
+            band_structure.get_frequencies())
+
+def _get_cached_band(phonon, qpoints) -> tuple:
+    """
+    get (distances, frequencies) from band cache,
+    None if not cached or cache is disabled
+    """
+    cache = get_phonon_cache()
+    if cache is None:
+        return None
+    key = get_band_key(get_phonon_hash(phonon), qpoints)
+    distances = cache.get(key + ':distances')
+    frequencies = cache.get(key + ':frequencies')
+    if distances is None or frequencies is None:
+        return None
+    return (list(np.array(distances)), list(np.array(frequencies)))
+
+def _set_cached_band(phonon, qpoints, distances, frequencies):
+    """
+    set (distances, frequencies) to band cache
+    """
+    cache = get_phonon_cache()
+    if cache is None:
+        return
+    key = get_band_key(get_phonon_hash(phonon), qpoints)
+    cache.set(key + ':distances', np.array(distances))
+    cache.set(key + ':frequencies', np.array(frequencies))
+
+def _get_band_path(phonon,
                    band_labels=None,
                    segment_qpoints=None,
                    is_auto=False,
-                   npoints=51):
+                   npoints=51) -> tuple:
+    """
+    get band path
+
+    Returns:
+        tuple: (qpoints, labels, path_connections)
+    """
     if is_auto:
         print("# band path is set automalically")
-        phonon.auto_band_structure(plot=False,
-                               write_yaml=False,
-                               with_eigenvectors=False,
-                               with_group_velocities=False,
-                               npoints=npoints)
-    else:
-        qpoints, path_connections = get_band_qpoints_and_path_connections(
-                segment_qpoints, npoints=npoints,
-                rec_lattice=np.linalg.inv(phonon.get_primitive().cell))
-        phonon.run_band_structure(paths=qpoints,
-                                  with_eigenvectors=True,
-                                  with_group_velocities=False,
-                                  is_band_connection=False,
-                                  path_connections=path_connections,
-                                  labels=band_labels,
-                                  is_legacy_plot=False)
-        phonon.write_yaml_band_structure()
+        return get_band_qpoints_by_seekpath(phonon.primitive, npoints)
+    qpoints, path_connections = get_band_qpoints_and_path_connections(
+            segment_qpoints, npoints=npoints,
+            rec_lattice=np.linalg.inv(phonon.get_primitive().cell))
+    return (qpoints, band_labels, path_connections)
+
+def _run_band_structure(phonon,
+                        qpoints,
+                        band_labels=None,
+                        path_connections=None,
+                        with_eigenvectors=False):
+    """
+    run band structure calculation along qpoints
+
+    Returns:
+        BandStructure: phonopy BandStructure object
+
+    Note:
+        Same as 'phonon.run_band_structure', but band structure is
+        returned and 'phonon.band_structure' is not changed,
+        so phonon needs not to be copied.
+    """
+    _check_dynamical_matrix(phonon)
+    return BandStructure(qpoints,
+                         phonon.dynamical_matrix,
+                         with_eigenvectors=with_eigenvectors,
+                         is_band_connection=False,
+                         path_connections=path_connections,
+                         labels=band_labels,
+                         is_legacy_plot=False,
+                         factor=phonon.unit_conversion_factor)
+
+def _run_band_calc(phonon,
+                   band_labels=None,
+                   segment_qpoints=None,
+                   is_auto=False,
+                   npoints=51,
+                   with_eigenvectors=False,
+                   write_yaml=False):
+    """
+    run band structure calculation
+
+    Returns:
+        BandStructure: phonopy BandStructure object
+
+    Note:
+        Phonon object is not changed, see '_run_band_structure'.
+        Only eigenvalues are calculated and no file is written
+        by default, which is enough for plotting.
+        If write_yaml=True, band.yaml is written in current directory.
+    """
+    qpoints, band_labels, path_connections = _get_band_path(
+            phonon=phonon,
+            band_labels=band_labels,
+            segment_qpoints=segment_qpoints,
+            is_auto=is_auto,
+            npoints=npoints)
+    band_structure = _run_band_structure(phonon=phonon,
+                                         qpoints=qpoints,
+                                         band_labels=band_labels,
+                                         path_connections=path_connections,
+                                         with_eigenvectors=with_eigenvectors)
+    if write_yaml:
+        band_structure.write_yaml()
+    return band_structure
+
+def dump_band(phonon,
+              filename,
+              band_labels=None,
+              segment_qpoints=None,
+              is_auto=False,
+              npoints=51,
+              with_eigenvectors=True):
+    """
+    run band structure calculation and save it with binary format
+
+    Args:
+        filename (str): '.npz', '.h5' or '.hdf5' file,
+                        see aiidaplus.io.save_band_structure
+    """
+    from aiidaplus.io import save_band_structure
+    band_structure = _run_band_calc(phonon=phonon,
+                                    band_labels=band_labels,
+                                    segment_qpoints=segment_qpoints,
+                                    is_auto=is_auto,
+                                    npoints=npoints,
+                                    with_eigenvectors=with_eigenvectors)
+    save_band_structure(band_structure, filename)
 
 def band_plot(fig,
               phonon,
@@ -586,6 +888,7 @@ def bands_plot(fig,
                linewidths=None,
                linestyles=None,
                labels=None,
+               workers=1,
                ):
     bp = BandsPlot(fig,
                    phonons,
@@ -595,7 +898,8 @@ def bands_plot(fig,
                    segment_qpoints=segment_qpoints,
                    is_auto=is_auto,
                    xscale=xscale,
-                   npoints=npoints)
+                   npoints=npoints,
+                   workers=workers)
     bp.plot_bands(cs=cs,
                   alphas=alphas,
                   linestyles=linestyles,
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+profiling
+---------
+opt-in instrumentation of aiidaplus.get_data
+
+Inside 'profile' context, the following calls are counted and timed.
+
+    load_node:       'load_node' called in aiidaplus.get_data
+    query:           QueryBuilder executions, including link traversal
+                     such as 'node.inputs'
+    attributes:      Node.attributes, Node.get_attribute, Dict.get_dict
+    repository:      ArrayData.get_array
+    spglib:          symmetry analyses with spglib (also via pymatgen)
+    force_constants: phonopy force constant builds
+
+aiida methods are wrapped only while profiling, so there is no overhead
+otherwise. Time of nested calls is attributed to the outermost category,
+for example queries run inside 'load_node' are counted as 'load_node'.
+Calls in worker processes are not recorded.
+
+Examples:
+    >>> with profile() as prof:
+    ...     get_shear_data(pk)
+    >>> print(format_report(prof.report()))
+"""
+
+import time
+import functools
+import contextlib
+
+CATEGORIES = ['load_node', 'query', 'attributes', 'repository',
+              'spglib', 'force_constants']
+
+_STATE = {'profile': None, 'depth': 0}
+
+
+class Profile():
+    """
+    counts and times of instrumented calls
+    """
+
+    def __init__(self):
+        self.counts = { category: 0 for category in CATEGORIES }
+        self.times = { category: 0. for category in CATEGORIES }
+        self._start = time.perf_counter()
+        self._wall_time = None
+
+    def add(self, category:str, elapsed:float, count:bool=True):
+        if count:
+            self.counts[category] += 1
+        self.times[category] += elapsed
+
+    def stop(self):
+        self._wall_time = time.perf_counter() - self._start
+
+    def report(self) -> dict:
+        """
+        get report
+
+        Returns:
+            dict: {'wall_time': seconds,
+                   'categories': {category: {'count', 'time'}},
+                   'other_time': wall time not in any category}
+        """
+        wall_time = self._wall_time
+        if wall_time is None:
+            wall_time = time.perf_counter() - self._start
+        return {
+            'wall_time': wall_time,
+            'categories': { category: {'count': self.counts[category],
+                                       'time': self.times[category]}
+                                for category in CATEGORIES },
+            'other_time': wall_time - sum(self.times.values()),
+            }
+
+
+@contextlib.contextmanager
+def record(category:str, count:bool=True):
+    """
+    count and time the block if profiling is active
+
+    Args:
+        category (str): one of CATEGORIES
+        count (bool): if False, only time is added
+    """
+    prof = _STATE['profile']
+    if prof is None or _STATE['depth'] > 0:
+        yield
+        return
+    _STATE['depth'] += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add(category, time.perf_counter() - start, count)
+        _STATE['depth'] -= 1
+
+
+def _wrap_function(category, func):
+    @functools.wraps(func)
+    def _wrapper(*args, **kwargs):
+        with record(category):
+            return func(*args, **kwargs)
+    return _wrapper
+
+
+def _wrap_generator(category, func):
+    @functools.wraps(func)
+    def _wrapper(*args, **kwargs):
+        items = func(*args, **kwargs)
+        first = True
+        while True:
+            with record(category, count=first):
+                try:
+                    item = next(items)
+                except StopIteration:
+                    return
+            first = False
+            yield item
+    return _wrapper
+
+
+def _get_patches() -> list:
+    """
+    get (owner, name, wrapped) to be patched while profiling
+    """
+    from aiida.orm import QueryBuilder, Node, Dict, ArrayData
+    from aiidaplus import get_data
+
+    def _method(cls, name, category, wrap=_wrap_function):
+        return (cls, name, wrap(category, getattr(cls, name)))
+
+    def _property(cls, name, category):
+        fget = getattr(cls, name).fget
+        return (cls, name, property(_wrap_function(category, fget)))
+
+    patches = [ _method(QueryBuilder, name, 'query')
+                    for name in ['all', 'first', 'one', 'count', 'dict'] ]
+    patches.extend([ _method(QueryBuilder, name, 'query', _wrap_generator)
+                         for name in ['iterall', 'iterdict'] ])
+    patches.extend([
+        _property(Node, 'attributes', 'attributes'),
+        _method(Node, 'get_attribute', 'attributes'),
+        _method(Dict, 'get_dict', 'attributes'),
+        _method(ArrayData, 'get_array', 'repository'),
+        (get_data, 'load_node',
+         _wrap_function('load_node', get_data.load_node)),
+        ])
+    return patches
+
+
+@contextlib.contextmanager
+def profile():
+    """
+    profile get_data calls in the block
+
+    Yields:
+        Profile: call 'report()' to get structured report
+
+    Raises:
+        RuntimeError: profile is already active
+    """
+    if _STATE['profile'] is not None:
+        raise RuntimeError("profile is already active")
+    patches = _get_patches()
+    originals = []
+    for owner, name, wrapped in patches:
+        # restore by deleting if the attribute is inherited
+        originals.append(owner.__dict__.get(name))
+        setattr(owner, name, wrapped)
+    prof = Profile()
+    _STATE['profile'] = prof
+    try:
+        yield prof
+    finally:
+        prof.stop()
+        _STATE['profile'] = None
+        for (owner, name, _), original in zip(patches, originals):
+            if original is None:
+                delattr(owner, name)
+            else:
+                setattr(owner, name, original)
+
+
+def profiled(func):
+    """
+    decorator, the decorated function returns (result, report)
+    """
+    @functools.wraps(func)
+    def _wrapper(*args, **kwargs):
+        with profile() as prof:
+            result = func(*args, **kwargs)
+        return (result, prof.report())
+    return _wrapper
+
+
+def format_report(report:dict) -> str:
+    """
+    format report as table
+    """
+    lines = ["{:>16} {:>8} {:>10}".format('category', 'count', 'time [s]')]
+    for category, value in report['categories'].items():
+        lines.append("{:>16} {:>8} {:>10.3f}".format(
+            category, value['count'], value['time']))
+    lines.append("{:>16} {:>8} {:>10.3f}".format(
+        'other', '', report['other_time']))
+    lines.append("{:>16} {:>8} {:>10.3f}".format(
+        'wall time', '', report['wall_time']))
+    return '\n'.join(lines)
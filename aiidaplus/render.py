@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+render
+------
+render figures of many nodes without display
+
+Data are fetched from database in the main process first, and figures
+are rendered from the fetched data in worker processes with Agg backend.
+Each worker reuses one figure object.
+"""
+
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+RENDER_PROCESS_TYPES = {
+        'aiida.workflows:twinpy.shear': 'shear',
+        'aiida.workflows:vasp.relax': 'relax',
+        'aiida.workflows:phonopy.phonopy': 'phonon',
+        }
+
+_WORKER = {'fig': None}
+
+
+def get_render_data(pk, kind:str) -> dict:
+    """
+    fetch data for rendering from database
+
+    Args:
+        pk: node pk
+        kind (str): 'shear', 'relax' or 'phonon'
+
+    Returns:
+        dict: data which can be sent to worker processes
+    """
+    from aiidaplus.get_data import (get_shear_data,
+                                    get_relax_data,
+                                    get_phonon_data)
+    if kind == 'shear':
+        return get_shear_data(pk)
+    elif kind == 'relax':
+        return get_relax_data(pk)
+    elif kind == 'phonon':
+        from aiidaplus.plot import get_phonon_inputs
+        _, phonon = get_phonon_data(pk, get_phonon=True)
+        return get_phonon_inputs(phonon)
+    else:
+        raise ValueError("kind %s is not supported" % kind)
+
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib import pyplot as plt
+    _WORKER['fig'] = plt.figure()
+
+
+def _render_shear(fig, pk, data):
+    from aiidaplus import plot as aiidaplot
+    aiidaplot.shear_plot(fig, data)
+
+
+def _render_relax(fig, pk, data):
+    from aiidaplus import plot as aiidaplot
+    steps = [ data['steps'][key] for key in sorted(data['steps']) ]
+    xdata = list(range(1, len(steps)+1))
+    ax1 = fig.add_subplot(121)
+    aiidaplot.line_chart(ax1,
+                         xdata,
+                         [ step['energy_no_entropy'] for step in steps ],
+                         'relax steps',
+                         'energy no entropy (eV)')
+    ax2 = fig.add_subplot(122)
+    aiidaplot.line_chart(ax2,
+                         xdata,
+                         [ step['maximum_force'] for step in steps ],
+                         'relax steps',
+                         'maximum force (eV / angstrom)')
+    fig.suptitle('relax result pk: %s' % pk)
+
+
+def _render_phonon(fig, pk, data):
+    from aiidaplus import plot as aiidaplot
+    phonon = aiidaplot.build_phonon(data)
+    aiidaplot.band_plot(fig, phonon, is_auto=True)
+    fig.suptitle('phonon result pk: %s' % pk)
+
+
+_RENDERERS = {
+        'shear': _render_shear,
+        'relax': _render_relax,
+        'phonon': _render_phonon,
+        }
+
+
+def render(kind:str, pk, data:dict, filename:str) -> str:
+    """
+    render figure and save it, called in worker process
+
+    Returns:
+        str: saved file name
+    """
+    if _WORKER['fig'] is None:
+        _init_worker()
+    fig = _WORKER['fig']
+    fig.clf()
+    _RENDERERS[kind](fig, pk, data)
+    fig.savefig(filename)
+    return filename
+
+
+def _render_item(item):
+    return render(*item)
+
+
+def render_nodes(nodes:list,
+                 dirname:str,
+                 fmt:str='png',
+                 workers:int=None) -> dict:
+    """
+    fetch data of nodes and render their figures in process pool
+
+    Args:
+        nodes (list): list of (pk, kind), kind is 'shear', 'relax'
+                      or 'phonon'
+        dirname (str): output directory, figures are saved as
+                       'pk<pk>_<kind>.<fmt>'
+        fmt (str): 'png' or 'pdf'
+        workers (int): the number of worker processes,
+                       if None, the number of cpus
+
+    Returns:
+        dict: 'files', 'fetch_time', 'render_time' and 'throughput'
+              (rendered figures per second)
+    """
+    os.makedirs(dirname, exist_ok=True)
+    start = time.time()
+    items = []
+    for pk, kind in nodes:
+        filename = os.path.join(dirname, 'pk{}_{}.{}'.format(pk, kind, fmt))
+        items.append((kind, pk, get_render_data(pk, kind), filename))
+    fetch_time = time.time() - start
+
+    start = time.time()
+    # spawn workers, they do not need db connection of this process
+    with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker) as executor:
+        files = list(executor.map(_render_item, items))
+    render_time = time.time() - start
+
+    return {
+        'files': files,
+        'fetch_time': fetch_time,
+        'render_time': render_time,
+        'throughput': len(files) / render_time if render_time > 0 else 0.,
+        }
@@ -6,8 +6,8 @@ aiida utils
 """
 import os
 import numpy as np
-import yaml
 from aiida.orm import StructureData
+from aiidaplus.io import load_yaml
 
 
 def get_elements_from_aiidastructure(aiidastructure:StructureData):
@@ -42,8 +42,7 @@ def get_default_potcar_mapping(elements:list):
             os.path.dirname(os.path.dirname(__file__)),
             'potcar',
             'default_potcar.yaml')
-    default_potcars = yaml.load(
-            open(default_potcar_file), Loader=yaml.SafeLoader)
+    default_potcars = load_yaml(default_potcar_file)
     mapping = {}
     for element in elements:
         mapping[element] = default_potcars[element]
@@ -68,7 +67,7 @@ def get_encut(potential_family:str,
             os.path.dirname(os.path.dirname(__file__)),
             'potcar',
             'encut_'+potential_family+'.yaml')
-    encuts = yaml.load(open(encut_file), Loader=yaml.SafeLoader)
+    encuts = load_yaml(encut_file)
     enmax = max([ encuts[key] for key in list(potential_mapping.values()) ])
     return enmax * multiply
 
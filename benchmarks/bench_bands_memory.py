@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark memory of bands_plot with dos for N = 1 .. 8 phonons.
+
+Two modes are compared:
+
+    deepcopy:   phonons are deep-copied before plotting,
+                which is what BandsPlot did before
+    copy-free:  phonons are passed as they are,
+                band structures and dos are calculated without changing them
+
+Peak memory is measured by tracemalloc (numpy arrays are traced).
+Band calculations are run in this process (workers=1).
+"""
+
+import os
+import argparse
+import time
+import tracemalloc
+from copy import deepcopy
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+import phonopy
+from aiidaplus.cache import set_phonon_cache
+from aiidaplus.plot import bands_plot, clear_total_dos_cache
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-f', '--filename', type=str,
+        default=os.path.join(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))), 'data', 'phonon', 'pk7295_phonon.yaml'),
+        help="phonopy params yaml, default: data/phonon/pk7295_phonon.yaml")
+    parser.add_argument('--mesh', type=int, nargs=3, default=[18, 18, 10],
+        help="dos mesh, default: 18 18 10")
+    parser.add_argument('--max_phonons', type=int, default=8,
+        help="max number of phonons, default: 8")
+    args = parser.parse_args()
+    return args
+
+def measure(phonons, mesh, copy) -> tuple:
+    """
+    Returns:
+        tuple: (time [s], peak memory [MiB])
+    """
+    clear_total_dos_cache()
+    fig = plt.figure()
+    tracemalloc.start()
+    start = time.perf_counter()
+    bands_plot(fig, deepcopy(phonons) if copy else phonons,
+               with_dos=True, mesh=mesh, is_auto=True, workers=1)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    plt.close(fig)
+    clear_total_dos_cache()
+    return elapsed, peak / 1024**2
+
+def main(filename, mesh, max_phonons):
+    # measure calculations, not disk cache
+    set_phonon_cache(None)
+    print("{:>4} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+        'N', 'copy [s]', 'copy [MiB]', 'free [s]', 'free [MiB]', 'unchanged'))
+    for n in range(1, max_phonons+1):
+        phonons = [ phonopy.load(filename) for _ in range(n) ]
+        copy_time, copy_peak = measure(phonons, mesh, copy=True)
+        free_time, free_peak = measure(phonons, mesh, copy=False)
+        unchanged = all([ phonon.band_structure is None
+                          and phonon.mesh is None for phonon in phonons ])
+        print("{:>4} {:>10.3f} {:>10.1f} {:>10.3f} {:>10.1f} {:>10}".format(
+            n, copy_time, copy_peak, free_time, free_peak, str(unchanged)))
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(filename=args.filename,
+         mesh=args.mesh,
+         max_phonons=args.max_phonons)
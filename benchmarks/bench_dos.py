@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark bands_plot with dos for N = 1 .. 8 phonons.
+
+Phonons are loaded from phonopy params yaml (force sets are included)
+N times, so each of them is a separate object.
+Each DOS is computed once per phonon, so the time grows linearly with N.
+"""
+
+import os
+import argparse
+import time
+import matplotlib
+matplotlib.use('Agg')
+from matplotlib import pyplot as plt
+import phonopy
+from aiidaplus.cache import set_phonon_cache
+from aiidaplus.plot import bands_plot, clear_total_dos_cache
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-f', '--filename', type=str,
+        default=os.path.join(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))), 'data', 'phonon', 'pk7295_phonon.yaml'),
+        help="phonopy params yaml, default: data/phonon/pk7295_phonon.yaml")
+    parser.add_argument('--mesh', type=int, nargs=3, default=[18, 18, 10],
+        help="dos mesh, default: 18 18 10")
+    parser.add_argument('--max_phonons', type=int, default=8,
+        help="max number of phonons, default: 8")
+    args = parser.parse_args()
+    return args
+
+def main(filename, mesh, max_phonons):
+    # measure calculations, not disk cache
+    set_phonon_cache(None)
+    print("{:>4} {:>10} {:>14}".format('N', 'time [s]', 'per phonon [s]'))
+    for n in range(1, max_phonons+1):
+        phonons = [ phonopy.load(filename) for _ in range(n) ]
+        clear_total_dos_cache()
+        fig = plt.figure()
+        start = time.perf_counter()
+        bands_plot(fig, phonons, with_dos=True, mesh=mesh, is_auto=True,
+                   workers=1)
+        elapsed = time.perf_counter() - start
+        plt.close(fig)
+        print("{:>4} {:>10.3f} {:>14.3f}".format(n, elapsed, elapsed / n))
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(filename=args.filename,
+         mesh=args.mesh,
+         max_phonons=args.max_phonons)
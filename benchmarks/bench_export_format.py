@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark write and read of exported data,
+yaml (PyYAML) round trip against binary formats of aiidaplus.io.
+"""
+
+import os
+import argparse
+import tempfile
+import timeit
+import yaml
+from aiidaplus.io import save_data, load_data, EXTENSIONS, BINARY_FORMATS
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-f', '--filename', type=str,
+        default=os.path.join(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))), 'data', 'relax', 'pk6228_relax.yaml'),
+        help="exported yaml file, default: data/relax/pk6228_relax.yaml")
+    parser.add_argument('--repeat', type=int, default=20,
+        help="number of write and read")
+    args = parser.parse_args()
+    return args
+
+def _dump_yaml(dic, filename):
+    with open(filename, 'w') as f:
+        yaml.dump(dic, f, indent=4, default_flow_style=False,
+                  explicit_start=True)
+
+def main(filename, repeat):
+    data = load_data(filename)
+    tmpdir = tempfile.mkdtemp()
+    print("file: {}".format(filename))
+    print("{:>8} {:>12} {:>12} {:>10} {:>6}".format(
+        'format', 'write [ms]', 'read [ms]', 'size [B]', 'same'))
+    for fmt in ['yaml'] + BINARY_FORMATS:
+        outfile = os.path.join(tmpdir, 'data' + EXTENSIONS[fmt])
+        if fmt == 'yaml':
+            write = lambda: _dump_yaml(data, outfile)
+        else:
+            write = lambda: save_data(data, outfile, fmt)
+        try:
+            write_time = timeit.timeit(write, number=repeat) / repeat
+        except ImportError as err:
+            print("{:>8} skipped ({})".format(fmt, err))
+            continue
+        read_time = timeit.timeit(lambda: load_data(outfile),
+                                  number=repeat) / repeat
+        same = load_data(outfile, as_list=True) == data
+        print("{:>8} {:>12.3f} {:>12.3f} {:>10} {:>6}".format(
+            fmt, write_time*1000, read_time*1000,
+            os.path.getsize(outfile), str(same)))
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(filename=args.filename, repeat=args.repeat)
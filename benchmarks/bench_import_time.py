@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Check import time of aiidaplus modules and command-line scripts
+with 'python -X importtime'.
+
+Exit status is 1 if some target exceeds its budget or imports
+heavy modules which must be imported lazily.
+"""
+
+import os
+import sys
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (name, python arguments, budget [ms])
+TARGETS = [
+        ('aiidaplus.cache', ['-c', 'import aiidaplus.cache'], 300),
+        ('aiidaplus.io', ['-c', 'import aiidaplus.io'], 300),
+        ('aiidaplus.render', ['-c', 'import aiidaplus.render'], 300),
+        ('aiidaplus.get_data', ['-c', 'import aiidaplus.get_data'], 2000),
+        ('aiidaplus.export', ['-c', 'import aiidaplus.export'], 2000),
+        ('aiidaplus-export.py',
+         [os.path.join(ROOT, 'scripts', 'aiidaplus-export.py'), '--help'],
+         2000),
+        ('aiidaplus-exportd.py',
+         [os.path.join(ROOT, 'scripts', 'aiidaplus-exportd.py'), '--help'],
+         300),
+        ]
+
+# these must not be imported at startup
+LAZY_MODULES = ['matplotlib', 'pymatgen', 'phonopy', 'twinpy', 'seekpath']
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1.,
+        help="multiply all budgets, use for slow machines")
+    args = parser.parse_args()
+    return args
+
+def get_import_times(python_args:list) -> dict:
+    """
+    run python with '-X importtime'
+
+    Returns:
+        dict: {module: (cumulative import time [ms], depth)},
+              depth is 0 for the modules imported at top level
+
+    Raises:
+        RuntimeError: python exits with error
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+            [ROOT] + [ path for path in [env.get('PYTHONPATH')] if path ])
+    proc = subprocess.run([sys.executable, '-X', 'importtime'] + python_args,
+                          stdout=subprocess.DEVNULL,
+                          stderr=subprocess.PIPE,
+                          universal_newlines=True,
+                          env=env)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    times = {}
+    for line in proc.stderr.splitlines():
+        fields = line[len('import time:'):].split('|')
+        if not line.startswith('import time:') or len(fields) != 3 \
+                or not fields[1].strip().isdigit():
+            continue
+        name = fields[2]
+        # nested imports are indented by two spaces
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (int(fields[1]) / 1000, depth)
+    return times
+
+def main(scale):
+    failed = False
+    print("{:>22} {:>10} {:>10}  {}".format(
+        'target', 'time [ms]', 'budget', 'lazy modules imported'))
+    for name, python_args, budget in TARGETS:
+        try:
+            times = get_import_times(python_args)
+        except RuntimeError as err:
+            print("{:>22} failed: {}".format(name, err))
+            failed = True
+            continue
+        total = sum([ time for time, depth in times.values() if depth == 0 ])
+        imported = [ lazy for lazy in LAZY_MODULES
+                         if any([ module == lazy or module.startswith(lazy+'.')
+                                      for module in times ]) ]
+        ok = total <= budget * scale and not imported
+        failed = failed or not ok
+        print("{:>22} {:>10.1f} {:>10.1f}  {} {}".format(
+            name, total, budget * scale, ' '.join(imported) or '-',
+            '' if ok else '(NG)'))
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(scale=args.scale)
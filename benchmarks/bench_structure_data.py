@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark per-structure cost of symmetry analysis,
+pymatgen path (get_structure_data_from_pymatgen) and
+spglib-direct path (get_structure_data_from_cell).
+"""
+
+import argparse
+import timeit
+import numpy as np
+from pymatgen.core.structure import Structure
+from aiidaplus.get_data import (get_structure_data_from_pymatgen,
+                                get_structure_data_from_cell)
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=20,
+        help="number of analyses for each structure")
+    args = parser.parse_args()
+    return args
+
+def get_hcp_cell(dim=(1,1,1), a=2.93, c=4.64):
+    """
+    get hexagonal close packed cell, natoms is 2 * dim[0] * dim[1] * dim[2]
+    """
+    lattice = np.array([[ a,  0.,              0.],
+                        [-a/2, a*np.sqrt(3)/2, 0.],
+                        [ 0.,  0.,              c]])
+    unit_coords = np.array([[1/3, 2/3, 1/4],
+                            [2/3, 1/3, 3/4]])
+    frac_coords = []
+    for i in range(dim[0]):
+        for j in range(dim[1]):
+            for k in range(dim[2]):
+                frac_coords.extend((unit_coords + np.array([i,j,k])) / dim)
+    lattice = lattice * np.array(dim).reshape(3,1)
+    numbers = [1] * len(frac_coords)
+    return (lattice, np.array(frac_coords), numbers)
+
+def main(repeat):
+    for dim in [(1,1,1), (5,5,10)]:
+        cell = get_hcp_cell(dim)
+        natoms = len(cell[2])
+
+        def _pymatgen():
+            pmgstructure = Structure(lattice=cell[0],
+                                     species=['Ti'] * natoms,
+                                     coords=cell[1])
+            return get_structure_data_from_pymatgen(pmgstructure)
+
+        def _spglib():
+            return get_structure_data_from_cell(cell)
+
+        pmg_time = timeit.timeit(_pymatgen, number=repeat) / repeat
+        spg_time = timeit.timeit(_spglib, number=repeat) / repeat
+        pmg_data = _pymatgen()
+        spg_data = _spglib()
+        same = all([ pmg_data[key] == spg_data[key]
+                         for key in ['number', 'international', 'hall',
+                                     'wyckoffs', 'site_symmetry_symbols'] ])
+        print("natoms: {}".format(natoms))
+        print("  pymatgen: {:.3e} sec / structure".format(pmg_time))
+        print("  spglib  : {:.3e} sec / structure".format(spg_time))
+        print("  speedup : {:.1f}".format(pmg_time / spg_time))
+        print("  same symmetry: {}".format(same))
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(repeat=args.repeat)
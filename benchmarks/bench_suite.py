@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark suite of aiidaplus on throwaway aiida profile.
+
+A temporary profile is created by aiida test manager (temporary PostgreSQL
+cluster with pgtest, or the profile set by AIIDA_TEST_PROFILE environment
+variable) and populated with synthetic nodes, see synthetic.py.
+Exported yaml files are checked to have no anchors (shared dicts) first.
+Then get_data functions, export script modes and plot builders are timed.
+
+Results can be saved and compared with a baseline:
+
+    % bench_suite.py --save baseline.json
+    (change code)
+    % bench_suite.py --compare baseline.json
+"""
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import timeit
+import importlib.util
+import numpy as np
+from aiida.manage.tests import test_manager
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('--dim', type=int, nargs=3, default=[1,1,1],
+        help="hcp cell is repeated by dim, natoms = 2 * prod(dim)")
+    parser.add_argument('--supercell_dim', type=int, nargs=3, default=[2,2,2],
+        help="phonon supercell, default: 2 2 2")
+    parser.add_argument('--relax_steps', type=int, default=3,
+        help="relax steps of each RelaxWorkChain, default: 3")
+    parser.add_argument('--shear_ratios', type=int, default=3,
+        help="shear ratios of ShearWorkChain, default: 3")
+    parser.add_argument('--repeat', type=int, default=5,
+        help="number of runs, median is reported, default: 5")
+    parser.add_argument('--cache', action='store_true',
+        help="use symmetry, force constants, band and dos caches "
+             "(warm after the first run)")
+    parser.add_argument('--skip_plots', action='store_true',
+        help="skip plot builders")
+    parser.add_argument('--save', type=str, default=None,
+        help="save results to json file")
+    parser.add_argument('--compare', type=str, default=None,
+        help="compare results with saved json file")
+    args = parser.parse_args()
+    return args
+
+def load_script(name:str):
+    """
+    load script in scripts directory as module
+    """
+    spec = importlib.util.spec_from_file_location(
+            name.replace('-', '_'), os.path.join(ROOT, 'scripts', name+'.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def get_cases(pks:dict, workdir:str, with_plots:bool) -> list:
+    """
+    get benchmark cases
+
+    Returns:
+        list: list of (name, function)
+    """
+    from aiidaplus.get_data import (get_structure_data,
+                                    get_vasp_data,
+                                    get_relax_data,
+                                    get_phonon_data,
+                                    get_shear_data)
+    export = load_script('aiidaplus-export')
+    cases = [
+        ('get_structure_data',
+         lambda: get_structure_data(pks['structure'])),
+        ('get_vasp_data',
+         lambda: get_vasp_data(pks['vasp'])),
+        ('get_relax_data',
+         lambda: get_relax_data(pks['relax'])),
+        ('get_phonon_data',
+         lambda: get_phonon_data(pks['phonon'])),
+        ('get_phonon_data(get_phonon)',
+         lambda: get_phonon_data(pks['phonon'], get_phonon=True)),
+        ('get_shear_data',
+         lambda: get_shear_data(pks['shear'])),
+        ('export structure yaml',
+         lambda: export.main(pks['structure'], get_data=True)),
+        ('export shear yaml',
+         lambda: export.main(pks['shear'], get_data=True)),
+        ('export shear npz',
+         lambda: export.main(pks['shear'], get_data=True, fmt='npz')),
+        ('export phonon npy',
+         lambda: export.main(pks['phonon'], get_data=True, fmt='npy')),
+        ('export group',
+         lambda: export.main_group(
+             pks['group'], os.path.join(workdir, 'group.jsonl.gz'))),
+        ]
+    if with_plots:
+        import matplotlib
+        matplotlib.use('Agg')
+        from matplotlib import pyplot as plt
+        from aiidaplus import plot as aiidaplot
+        from aiidaplus.render import render, get_render_data
+        fig = plt.figure()
+        _, phonon = get_phonon_data(pks['phonon'], get_phonon=True)
+        shear = get_render_data(pks['shear'], 'shear')
+        relax = get_render_data(pks['relax'], 'relax')
+        phonon_data = get_render_data(pks['phonon'], 'phonon')
+
+        def _band_plot(with_dos):
+            fig.clf()
+            aiidaplot.band_plot(fig, phonon, with_dos=with_dos,
+                                mesh=[10, 10, 6], is_auto=True)
+
+        cases.extend([
+            ('plot band', lambda: _band_plot(False)),
+            ('plot band with dos', lambda: _band_plot(True)),
+            ('render shear', lambda: render(
+                'shear', pks['shear'], shear,
+                os.path.join(workdir, 'shear.png'))),
+            ('render relax', lambda: render(
+                'relax', pks['relax'], relax,
+                os.path.join(workdir, 'relax.png'))),
+            ('render phonon', lambda: render(
+                'phonon', pks['phonon'], phonon_data,
+                os.path.join(workdir, 'phonon.png'))),
+            ('export render group', lambda: export.main_render(
+                os.path.join(workdir, 'render'), group=pks['group'])),
+            ])
+    return cases
+
+def check_exports(pks:dict, workdir:str):
+    """
+    check exported yaml files have no anchors / aliases,
+    which appear if data share dicts
+
+    Raises:
+        RuntimeError: anchors are found
+    """
+    from aiidaplus.io import dump_yaml
+    from aiidaplus.get_data import (get_vasp_data,
+                                    get_relax_data,
+                                    get_shear_data)
+    for name, data in [('vasp', get_vasp_data(pks['vasp'])),
+                       ('relax', get_relax_data(pks['relax'])),
+                       ('shear', get_shear_data(pks['shear']))]:
+        filename = os.path.join(workdir, 'check_%s.yaml' % name)
+        dump_yaml(data, filename)
+        with open(filename) as f:
+            if '&id' in f.read():
+                raise RuntimeError("%s yaml has anchors" % name)
+
+def run(cases:list, repeat:int) -> dict:
+    """
+    run cases
+
+    Returns:
+        dict: {name: median time [s]}, None if the case failed
+    """
+    results = {}
+    for name, func in cases:
+        try:
+            times = timeit.repeat(func, number=1, repeat=repeat)
+            results[name] = float(np.median(times))
+        except Exception as err:
+            print("{} failed: {}: {}".format(name, type(err).__name__, err))
+            results[name] = None
+    return results
+
+def print_results(results:dict, baseline:dict=None):
+    print("{:>30} {:>10} {:>10} {:>8}".format(
+        'case', 'time [s]', 'baseline', 'ratio'))
+    for name, time in results.items():
+        base = None if baseline is None else baseline.get(name)
+        print("{:>30} {:>10} {:>10} {:>8}".format(
+            name,
+            '-' if time is None else '%.4f' % time,
+            '-' if base is None else '%.4f' % base,
+            '-' if time is None or not base else '%.2f' % (time / base)))
+
+def main(dim, supercell_dim, relax_steps, shear_ratios, repeat, cache,
+         skip_plots, save, compare):
+    from synthetic import populate
+    from aiidaplus.cache import (SymmetryCache,
+                                 ArrayCache,
+                                 set_symmetry_cache,
+                                 set_force_constants_cache,
+                                 set_phonon_cache)
+    params = {'dim': dim, 'supercell_dim': supercell_dim,
+              'relax_steps': relax_steps, 'shear_ratios': shear_ratios,
+              'cache': cache}
+    with tempfile.TemporaryDirectory() as workdir, test_manager():
+        if cache:
+            set_symmetry_cache(
+                    SymmetryCache(os.path.join(workdir, 'symmetry.sqlite')))
+            set_force_constants_cache(
+                    ArrayCache(os.path.join(workdir, 'force_constants')))
+            set_phonon_cache(ArrayCache(os.path.join(workdir, 'phonon')))
+        else:
+            set_symmetry_cache(None)
+            set_force_constants_cache(None)
+            set_phonon_cache(None)
+        pks = populate(dim=dim,
+                       relax_steps=relax_steps,
+                       supercell_dim=supercell_dim,
+                       shear_ratios=shear_ratios)
+        # export script writes files in current directory
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            check_exports(pks, workdir)
+            results = run(get_cases(pks, workdir, not skip_plots), repeat)
+        finally:
+            os.chdir(cwd)
+
+    baseline = None
+    if compare is not None:
+        with open(compare) as f:
+            saved = json.load(f)
+        if saved['params'] != params:
+            print("WARNING: parameters differ from baseline: {}".format(
+                saved['params']))
+        baseline = saved['results']
+    print_results(results, baseline)
+    if save is not None:
+        with open(save, 'w') as f:
+            json.dump({'params': params, 'results': results}, f, indent=4)
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(dim=args.dim,
+         supercell_dim=args.supercell_dim,
+         relax_steps=args.relax_steps,
+         shear_ratios=args.shear_ratios,
+         repeat=args.repeat,
+         cache=args.cache,
+         skip_plots=args.skip_plots,
+         save=args.save,
+         compare=args.compare)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Benchmark load and dump of large yaml file such as phonopy band.yaml
+with eigenvectors, pure Python SafeLoader / SafeDumper against
+the loader and dumper used in aiidaplus.io.
+"""
+
+import os
+import argparse
+import tempfile
+import time
+import yaml
+from aiidaplus.io import YamlLoader, YamlDumper, load_yaml, dump_yaml
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('-f', '--filename', type=str,
+        default=os.path.join(os.path.dirname(os.path.dirname(
+            os.path.abspath(__file__))), 'jupyter', 'band.yaml'),
+        help="yaml file, default: jupyter/band.yaml")
+    parser.add_argument('--skip_python', action='store_true',
+        help="skip pure Python loader, which takes minutes for "
+             "band.yaml with eigenvectors of large cells")
+    args = parser.parse_args()
+    return args
+
+def _load_python(filename):
+    with open(filename) as f:
+        return yaml.load(f, Loader=yaml.SafeLoader)
+
+def _dump_python(dic, filename):
+    with open(filename, 'w') as f:
+        yaml.dump(dic, f, Dumper=yaml.SafeDumper, indent=4,
+                  default_flow_style=False)
+
+def _time(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return (time.perf_counter() - start, result)
+
+def main(filename, skip_python):
+    print("file: {} ({:.1f} MB)".format(
+        filename, os.path.getsize(filename) / 1024**2))
+    print("aiidaplus.io: {} / {}".format(YamlLoader.__name__,
+                                         YamlDumper.__base__.__name__))
+    load_time, data = _time(load_yaml, filename)
+    with tempfile.TemporaryDirectory() as dirname:
+        outfile = os.path.join(dirname, 'out.yaml')
+        dump_time, _ = _time(dump_yaml, data, outfile)
+        rows = [('aiidaplus.io', load_time, dump_time)]
+        if not skip_python:
+            load_time, python_data = _time(_load_python, filename)
+            dump_time, _ = _time(_dump_python, python_data, outfile)
+            rows.append(('SafeLoader', load_time, dump_time))
+            assert python_data == data
+    print("{:>14} {:>10} {:>10}".format('', 'load [s]', 'dump [s]'))
+    for name, load_time, dump_time in rows:
+        print("{:>14} {:>10.3f} {:>10.3f}".format(name, load_time, dump_time))
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(args.filename, args.skip_python)
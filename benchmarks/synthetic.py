@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Populate aiida profile with synthetic nodes for benchmarks.
+
+The provenance graphs mimic the workchains read by aiidaplus.get_data
+(only nodes and links, no calculation is run):
+
+    VaspWorkChain:     inputs structure, parameters, settings, kpoints,
+                       potential_family, potential_mapping
+                       outputs structure, misc
+    RelaxWorkChain:    calls VerifyWorkChain -> VaspWorkChain for each step,
+                       the last step is static (no 'nsw' in incar)
+                       outputs relax__structure, misc, forces, stress
+    PhonopyWorkChain:  outputs phonon_setting_info, primitive, supercell,
+                       force_sets (random forces)
+    ShearWorkChain:    calls RelaxWorkChain and PhonopyWorkChain
+                       for each shear ratio
+"""
+
+import numpy as np
+from aiida.orm import (StructureData, KpointsData, Dict, Str, Float,
+                       ArrayData, WorkChainNode, Group)
+from aiida.common.links import LinkType
+from aiida.plugins.entry_point import format_entry_point_string
+
+VASP_PROCESS_TYPE = format_entry_point_string('aiida.workflows', 'vasp.vasp')
+VERIFY_PROCESS_TYPE = format_entry_point_string('aiida.workflows',
+                                                'vasp.verify')
+RELAX_PROCESS_TYPE = format_entry_point_string('aiida.workflows', 'vasp.relax')
+PHONOPY_PROCESS_TYPE = format_entry_point_string('aiida.workflows',
+                                                 'phonopy.phonopy')
+SHEAR_PROCESS_TYPE = format_entry_point_string('aiida.workflows',
+                                               'twinpy.shear')
+
+
+def get_hcp_structure(dim=(1,1,1), a=2.93, c=4.64) -> StructureData:
+    """
+    get unstored hcp Ti, natoms is 2 * dim[0] * dim[1] * dim[2]
+    """
+    lattice = np.array([[ a,  0.,              0.],
+                        [-a/2, a*np.sqrt(3)/2, 0.],
+                        [ 0.,  0.,              c]]) \
+                  * np.array(dim).reshape(3,1)
+    unit_coords = np.array([[1/3, 2/3, 1/4],
+                            [2/3, 1/3, 3/4]])
+    structure = StructureData(cell=lattice)
+    for i in range(dim[0]):
+        for j in range(dim[1]):
+            for k in range(dim[2]):
+                for coord in (unit_coords + np.array([i,j,k])) / dim:
+                    structure.append_atom(position=np.dot(coord, lattice),
+                                          symbols='Ti')
+    return structure
+
+
+def _store(data):
+    if not data.is_stored:
+        data.store()
+    return data
+
+
+def _workchain(process_type:str, inputs:dict, caller=None, label=''):
+    node = WorkChainNode()
+    node.set_process_type(process_type)
+    node.label = label
+    for link_label, data in inputs.items():
+        node.add_incoming(_store(data), LinkType.INPUT_WORK, link_label)
+    if caller is not None:
+        node.add_incoming(caller, LinkType.CALL_WORK, 'CALL')
+    node.set_exit_status(0)
+    node.store()
+    return node
+
+
+def _return(node, outputs:dict):
+    for link_label, data in outputs.items():
+        _store(data).add_incoming(node, LinkType.RETURN, link_label)
+
+
+def _get_misc(rng, natoms):
+    return Dict(dict={
+        'maximum_force': float(rng.random()),
+        'maximum_stress': float(rng.random()),
+        'total_energies': {'energy_no_entropy': -7.8 * natoms - rng.random()},
+        })
+
+
+def create_vasp(structure, rng, static=False, caller=None):
+    """
+    create VaspWorkChain node
+    """
+    incar = {'encut': 350, 'ediff': 1e-6, 'ismear': 1, 'sigma': 0.2}
+    if not static:
+        incar.update({'nsw': 40, 'ibrion': 2, 'isif': 3})
+    kpoints = KpointsData()
+    kpoints.set_kpoints_mesh([8, 8, 5], offset=[0., 0., 0.5])
+    inputs = {
+        'structure': structure,
+        'parameters': Dict(dict=incar),
+        'settings': Dict(dict={'parser_settings': {'add_structure': True}}),
+        'kpoints': kpoints,
+        'potential_family': Str('PBE.54'),
+        'potential_mapping': Dict(dict={'Ti': 'Ti_pv'}),
+        }
+    node = _workchain(VASP_PROCESS_TYPE, inputs, caller=caller)
+    final = structure.clone()
+    _return(node, {'structure': final,
+                   'misc': _get_misc(rng, len(structure.sites))})
+    return node
+
+
+def create_relax(structure, rng, steps=3, caller=None, label=''):
+    """
+    create RelaxWorkChain node which calls 'steps' relax steps
+    and final static calculation
+    """
+    node = _workchain(RELAX_PROCESS_TYPE, {'structure': structure},
+                      caller=caller, label=label)
+    for i in range(steps+1):
+        verify = _workchain(VERIFY_PROCESS_TYPE, {}, caller=node)
+        vasp = create_vasp(structure, rng, static=(i==steps), caller=verify)
+        _return(verify, {'structure': vasp.outputs.structure})
+    natoms = len(structure.sites)
+    forces = ArrayData()
+    forces.set_array('final', rng.normal(scale=0.01, size=(natoms, 3)))
+    stress = ArrayData()
+    stress.set_array('final', rng.normal(size=(3, 3)))
+    _return(node, {'relax__structure': structure.clone(),
+                   'misc': _get_misc(rng, natoms),
+                   'forces': forces,
+                   'stress': stress})
+    return node
+
+
+def create_phonon(structure, rng, supercell_dim=(2,2,2), caller=None):
+    """
+    create PhonopyWorkChain node with random force sets
+    """
+    from pymatgen.io.phonopy import get_phonopy_structure
+    from phonopy import Phonopy
+    supercell_matrix = np.diag(supercell_dim).tolist()
+    primitive_matrix = np.eye(3).tolist()
+    phonon = Phonopy(get_phonopy_structure(structure.get_pymatgen()),
+                     supercell_matrix=supercell_matrix,
+                     primitive_matrix=primitive_matrix)
+    phonon.generate_displacements()
+    dataset = phonon.get_displacement_dataset()
+    dataset = {
+        'natom': int(dataset['natom']),
+        'first_atoms': [ {'number': int(disp['number']),
+                          'displacement': [ float(x)
+                                                for x in disp['displacement'] ]}
+                             for disp in dataset['first_atoms'] ],
+        }
+
+    inputs = {
+        'structure': structure,
+        'symmetry_tolerance': Float(1e-5),
+        'calculator_settings': Dict(dict={'forces': {'code_string': 'vasp'}}),
+        }
+    node = _workchain(PHONOPY_PROCESS_TYPE, inputs, caller=caller)
+    phonopy_supercell = phonon.get_supercell()
+    supercell = StructureData(cell=phonopy_supercell.get_cell())
+    for position, symbol in zip(phonopy_supercell.get_positions(),
+                                phonopy_supercell.get_chemical_symbols()):
+        supercell.append_atom(position=position, symbols=symbol)
+    force_sets = ArrayData()
+    force_sets.set_array('force_sets',
+                         rng.normal(scale=0.1,
+                                    size=(len(dataset['first_atoms']),
+                                          dataset['natom'], 3)))
+    _return(node, {
+        'phonon_setting_info': Dict(dict={
+            'supercell_matrix': supercell_matrix,
+            'primitive_matrix': primitive_matrix,
+            'displacement_dataset': dataset,
+            'mesh': [10, 10, 6],
+            }),
+        'primitive': structure.clone(),
+        'supercell': supercell,
+        'force_sets': force_sets,
+        })
+    return node
+
+
+def create_shear(structure, rng, ratios=3, relax_steps=3,
+                 supercell_dim=(2,2,2), with_phonon=True):
+    """
+    create ShearWorkChain node which calls relax and phonon for each ratio
+    """
+    inputs = {
+        'calculator_settings': Dict(dict={'relax': {}, 'phonon': {}}),
+        'shear_conf': Dict(dict={'twinmode': '10-12', 'grids': ratios}),
+        }
+    node = _workchain(SHEAR_PROCESS_TYPE, inputs)
+    for i in range(ratios):
+        relax = create_relax(structure, rng, steps=relax_steps, caller=node,
+                             label='shear_%03d' % i)
+        if with_phonon:
+            create_phonon(relax.outputs.relax__structure, rng,
+                          supercell_dim=supercell_dim, caller=node)
+    natoms = len(structure.sites)
+    _return(node, {
+        'parent': structure.clone(),
+        'relax_results': Dict(dict={
+            'energies': (-7.8 * natoms + rng.random(ratios)).tolist()}),
+        'shear_ratios': Dict(dict={
+            'shear_ratios': np.linspace(0, 1, ratios).tolist()}),
+        'gamma': Float(0.17),
+        })
+    return node
+
+
+def populate(dim=(1,1,1), relax_steps=3, supercell_dim=(2,2,2),
+             shear_ratios=3, group_label='aiidaplus-bench', seed=0) -> dict:
+    """
+    populate current profile with synthetic nodes
+
+    Args:
+        dim (tuple): hcp cell is repeated by dim, natoms = 2 * prod(dim)
+        relax_steps (int): relax steps of RelaxWorkChain
+        supercell_dim (tuple): phonon supercell
+        shear_ratios (int): number of shear ratios of ShearWorkChain
+        group_label (str): all top level nodes are added to this group
+
+    Returns:
+        dict: pks, 'structure', 'vasp', 'relax', 'phonon', 'shear'
+              and group label 'group'
+    """
+    rng = np.random.default_rng(seed)
+    structure = _store(get_hcp_structure(dim))
+    vasp = create_vasp(structure, rng)
+    relax = create_relax(structure, rng, steps=relax_steps)
+    phonon = create_phonon(structure, rng, supercell_dim=supercell_dim)
+    shear = create_shear(structure, rng, ratios=shear_ratios,
+                         relax_steps=relax_steps,
+                         supercell_dim=supercell_dim)
+    group, _ = Group.objects.get_or_create(label=group_label)
+    group.add_nodes([structure, vasp, relax, phonon, shear])
+    return {
+        'structure': structure.pk,
+        'vasp': vasp.pk,
+        'relax': relax.pk,
+        'phonon': phonon.pk,
+        'shear': shear.pk,
+        'group': group_label,
+        }
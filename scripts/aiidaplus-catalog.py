@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+"""
+This script indexes exported files in directory and queries the index
+without reading exported files.
+
+  index: index new or modified files in directory
+  query: print files matching filters, index is updated before query
+
+filters: 'field=value' or 'field=min:max' (min or max can be omitted)
+fields:  pk, data_type, encut, sigma, kpoint_density, energy, natoms,
+         space_group, international
+"""
+
+import argparse
+from aiidaplus.catalog import Catalog, CATALOG_FIELDS
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('command', type=str, choices=['index', 'query'],
+        help="command")
+    parser.add_argument('-d', '--dirname', type=str, default='data',
+        help="export directory, default: data")
+    parser.add_argument('-f', '--filters', type=str, nargs='*', default=[],
+        help="filters of 'query', ex. data_type=RelaxWorkChain sigma=0.1:0.3")
+    parser.add_argument('--order_by', type=str, default='pk',
+        help="field to sort, default: pk")
+    args = parser.parse_args()
+    return args
+
+def parse_filters(filters:list) -> dict:
+    """
+    parse 'field=value' or 'field=min:max' strings
+    """
+    types = dict(CATALOG_FIELDS)
+    dic = {}
+    for string in filters:
+        name, value = string.split('=', 1)
+        if types.get(name) == 'TEXT':
+            dic[name] = value
+            continue
+        typ = int if types.get(name) == 'INTEGER' else float
+        if ':' in value:
+            dic[name] = tuple([ typ(val) if val else None
+                                    for val in value.split(':', 1) ])
+        else:
+            dic[name] = typ(value)
+    return dic
+
+def main(command, dirname, filters, order_by):
+    catalog = Catalog(dirname)
+    stats = catalog.update()
+    if command == 'index':
+        print("{} indexed, {} removed, {} unchanged".format(
+            stats['indexed'], stats['removed'], stats['unchanged']))
+        return
+
+    names = [ name for name, _ in CATALOG_FIELDS ]
+    print(' '.join(names + ['path']))
+    for row in catalog.query(order_by=order_by, **parse_filters(filters)):
+        print(' '.join([ str(row[name]) for name in names + ['path'] ]))
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(command=args.command,
+         dirname=args.dirname,
+         filters=args.filters,
+         order_by=args.order_by)
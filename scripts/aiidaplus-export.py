@@ -6,31 +6,31 @@
 This script helps you export various data from aiida database.
 """
 
+# matplotlib, twinpy and aiidaplus.plot are imported in the functions
+# which use them, because this script is called many times in shell loops
+# and importing them dominates the startup time.
+
 import argparse
-import yaml
+import contextlib
 import warnings
 import numpy as np
 from pprint import pprint
-from matplotlib import pyplot as plt
-from aiida.orm import load_node, QueryBuilder, Node
+from aiida.orm import load_node
 from aiida.cmdline.utils.decorators import with_dbenv
-from aiida.plugins import WorkflowFactory
-from pymatgen.io import vasp as pmgvasp
 from aiidaplus.get_data import (get_structure_data,
                                 get_relax_data,
                                 get_phonon_data,
                                 get_shear_data,
                                 get_twinboundary_relax_data,
+                                get_structure_analysis_stats,
                                 )
-from aiidaplus import plot as aiidaplot
-from twinpy.common.kpoints import get_mesh_offset_from_direct_lattice
-from twinpy.interfaces.aiida.vasp import (AiidaVaspWorkChain,
-                                          AiidaRelaxWorkChain)
-from twinpy.interfaces.aiida.phonopy import AiidaPhonopyWorkChain
-from twinpy.interfaces.aiida.twinboundary \
-        import AiidaTwinBoudnaryRelaxWorkChain
-
-RELAX_WF = WorkflowFactory('vasp.relax')
+from aiidaplus.export import export_group, get_group_nodes
+from aiidaplus.render import render_nodes, RENDER_PROCESS_TYPES
+from aiidaplus.profiling import profile, format_report
+from aiidaplus.io import (save_data,
+                          save_phonon_arrays,
+                          dump_yaml,
+                          EXTENSIONS)
 
 # argparse
 def get_argparse():
@@ -38,10 +38,34 @@ def get_argparse():
         description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
     parser.add_argument('-pk', '--node_pk', type=int, default=None,
         help="node pk, currently supported StructureData")
+    parser.add_argument('--group', type=str, default=None,
+        help="group label, export all supported nodes in the group "
+             "to JSON Lines file")
+    parser.add_argument('-o', '--output', type=str, default=None,
+        help="output file of '--group', default: <group>.jsonl.gz")
+    parser.add_argument('--incremental', action='store_true',
+        help="with '--group', export only nodes new or modified "
+             "since the last export")
+    parser.add_argument('--render', type=str, default=None,
+        help="render figures of '-pk' or '--group' nodes to this "
+             "directory without display, supported shear, relax and phonon")
+    parser.add_argument('--render_format', type=str, default='png',
+        choices=['png', 'pdf'],
+        help="figure format of '--render', default: png")
+    parser.add_argument('--workers', type=int, default=None,
+        help="the number of render processes, default: the number of cpus")
     parser.add_argument('--get_data', action='store_true',
         help="get data")
+    parser.add_argument('--format', type=str, default='yaml',
+        choices=['yaml', 'npz', 'hdf5', 'parquet', 'npy'],
+        help="file format of '--get_data', default: yaml\n"
+             "'npy' is only for PhonopyWorkChain, which writes force "
+             "constants,\nforce sets and displacements as .npy arrays")
     parser.add_argument('--show', action='store_true',
         help="show the detailed information of data")
+    parser.add_argument('--profile', action='store_true',
+        help="print counts and times of load_node, queries, attribute "
+             "and repository reads,\nspglib calls and force constant builds")
     parser.add_argument('--additional_relax_pks', type=str, default='',
         help="additional relax pks")
     parser.add_argument('--ev_range', type=float, default=4.,
@@ -52,11 +76,22 @@ def get_argparse():
     return args
 
 def dic2yaml(dic, filename):
-    with open(filename, 'w') as f:
-        yaml.dump(dic, f, indent=4, default_flow_style=False, explicit_start=True)
+    dump_yaml(dic, filename, explicit_start=True)
+
+def dump_data(dic, basename, fmt='yaml'):
+    """
+    dump data to '<basename>.<extension of fmt>'
+    """
+    if fmt not in EXTENSIONS:
+        raise ValueError("format %s is not supported for this data" % fmt)
+    filename = basename + EXTENSIONS[fmt]
+    if fmt == 'yaml':
+        dic2yaml(dic, filename)
+    else:
+        save_data(dic, filename, fmt)
 
 # functions
-def _export_shear(pk, get_data, show):
+def _export_shear(pk, get_data, show, fmt='yaml'):
 
     # def __get_results():
     #     parent = node.outputs.parent.get_pymatgen()
@@ -84,22 +119,10 @@ def _export_shear(pk, get_data, show):
     #     return dic
 
     def _show(dic):
+        from matplotlib import pyplot as plt
+        from aiidaplus import plot as aiidaplot
         fig = plt.figure()
-        # ax1 = fig.add_axes((0.15, 0.1, 0.35,  0.35))
-        # ax2 = fig.add_axes((0.63, 0.1, 0.35, 0.35))
-        # ax3 = fig.add_axes((0.15, 0.55, 0.35, 0.35))
-        # ax4 = fig.add_axes((0.63, 0.55, 0.35, 0.35))
-        ax1 = fig.add_subplot(111)
-        aiidaplot.line_chart(
-                ax1,
-                dic['gamma'] * np.array(dic['shear_ratios']),
-                (np.array(dic['relax_results']['energies']) \
-                    - dic['relax_results']['energies'][0]) \
-                      * 1000 / dic['parent']['natoms'],
-                "strain (angstrom)",
-                "energy (meV / atom)"
-                )
-        fig.suptitle('shear result pk: %s' % pk)
+        aiidaplot.shear_plot(fig, dic)
         plt.show()
 
     results = get_shear_data(pk)
@@ -108,21 +131,22 @@ def _export_shear(pk, get_data, show):
         # for key in results:
         #     if type(results[key]) == np.ndarray:
         #         results[key] = results[key].tolist()
-        yamlname = basename+'.yaml'
-        with open(yamlname, 'w') as f:
-            yaml.dump(results, f, indent=4, default_flow_style=False)
+        if fmt == 'yaml':
+            yamlname = basename+'.yaml'
+            dump_yaml(results, yamlname)
+        else:
+            dump_data(results, basename, fmt)
     if show:
         _show(results)
 
-def _export_structure(pk, get_data, show):
+def _export_structure(pk, get_data, show, fmt='yaml'):
     data = get_structure_data(pk)
     if show:
         for key in data:
             print(key+':')
             pprint(data[key])
     if get_data:
-        filename = 'pk'+str(pk)+'_structure.yaml'
-        dic2yaml(data, filename)
+        dump_data(data, 'pk'+str(pk)+'_structure', fmt)
 
 
 # def _export_twinboundary_relax(pk, get_data, show, ymax):
@@ -154,9 +178,12 @@ def _export_structure(pk, get_data, show):
 
 
 def _export_twinboundary_relax(pk, show, additional_relax_pks=None):
+    from twinpy.interfaces.aiida.twinboundary \
+            import AiidaTwinBoudnaryRelaxWorkChain
     tb_relax = AiidaTwinBoudnaryRelaxWorkChain(load_node(pk))
     tb_relax.get_description()
     if show:
+        from matplotlib import pyplot as plt
         aiida_relax = tb_relax.get_aiida_relax(
                 additional_relax_pks=additional_relax_pks)
         tb_analyzer = tb_relax.get_twinboundary_analyzer(
@@ -168,6 +195,8 @@ def _export_twinboundary_relax(pk, show, additional_relax_pks=None):
 
 
 def _export_twinboundary(pk, get_data, show, ev_range=4.):
+    from matplotlib import pyplot as plt
+    from aiidaplus import plot as aiidaplot
     data = get_twinboundary_data(pk)
     conf = load_node(pk).inputs.twinboundary_conf
     lattice = load_node(data['structure_pks'][0][0]).get_pymatgen_structure().lattice
@@ -202,6 +231,8 @@ def _export_twinboundary(pk, get_data, show, ev_range=4.):
 
 def _export_twinboundary_shear(pk, get_data, show):
     # not edited yet
+    from matplotlib import pyplot as plt
+    from aiidaplus import plot as aiidaplot
     data = get_twinboundary_data(pk)
     conf = load_node(pk).inputs.twinboundary_conf
     lattice = load_node(data['structure_pks'][0][0]).get_pymatgen_structure().lattice
@@ -234,7 +265,11 @@ def _export_twinboundary_shear(pk, get_data, show):
         dic2yaml(data, filename)
 
 
-def _export_phonon(pk, get_data, show):
+def _export_phonon(pk, get_data, show, fmt='yaml'):
+    if get_data and fmt not in ['yaml', 'npy']:
+        raise ValueError("format %s is not supported for phonon, "
+                         "use 'yaml' or 'npy'" % fmt)
+    from twinpy.interfaces.aiida.phonopy import AiidaPhonopyWorkChain
     aiph = AiidaPhonopyWorkChain(load_node(pk))
     aiph.get_description()
 
@@ -250,9 +285,17 @@ def _export_phonon(pk, get_data, show):
                                    npoints=51)
         phonon.plot_band_structure_and_dos().show()
     if get_data:
-        analyzer = aiph.get_phonon_analyzer()
-        filename = 'pk' + str(pk) + '_phonopy_params.yaml'
-        analyzer.export_phonon(filename=filename)
+        if fmt == 'npy':
+            dic, phonon = get_phonon_data(pk, get_phonon=True)
+            dirname = 'pk' + str(pk) + '_phonopy_params'
+            save_phonon_arrays(phonon, dirname,
+                               metadata={'pk': pk,
+                                         'data_type': dic['data_type']})
+        else:
+            # phonopy params yaml
+            analyzer = aiph.get_phonon_analyzer()
+            filename = 'pk' + str(pk) + '_phonopy_params.yaml'
+            analyzer.export_phonon(filename=filename)
 
 
 def _export_kpoints(pk):
@@ -261,20 +304,35 @@ def _export_kpoints(pk):
     pprint(kpt.get_kpoints_mesh())
 
 def _export_vasp(pk):
+    from twinpy.interfaces.aiida.vasp import AiidaVaspWorkChain
     aiida_vasp = AiidaVaspWorkChain(load_node(pk))
     aiida_vasp.get_description()
 
 
 def _export_relax(pk, show):
+    from twinpy.interfaces.aiida.vasp import AiidaRelaxWorkChain
     aiida_relax = AiidaRelaxWorkChain(load_node(pk))
     aiida_relax.get_description()
     if show:
+        from matplotlib import pyplot as plt
         aiida_relax.plot_convergence()
         plt.show()
 
+def print_structure_analysis_stats():
+    """
+    print structure analyses saved by symmetry cache and sharing
+    the same structure, nothing is printed if no structure is requested
+    """
+    stats = get_structure_analysis_stats()
+    if stats['requested'] == 0:
+        return
+    print("structure analyses: {} analyzed, {} cached, "
+          "{} saved by sharing the same structure".format(
+              stats['analyzed'], stats['cached'], stats['deduplicated']))
+
 @with_dbenv()
 def main(pk, get_data=False, show=False, ev_range=4., ymax=None,
-         additional_relax_pks=[],):
+         additional_relax_pks=[], fmt='yaml'):
     """
     export specified pk data
 
@@ -286,6 +344,10 @@ def main(pk, get_data=False, show=False, ev_range=4., ymax=None,
             if True, export data
         show: bool, default False
             if True, show detailed information
+        fmt: str, default 'yaml'
+            file format of exported data,
+            'yaml', 'npz', 'hdf5' or 'parquet',
+            or 'npy' for PhonopyWorkChain
 
         Notes
         -----
@@ -300,7 +362,7 @@ def main(pk, get_data=False, show=False, ev_range=4., ymax=None,
     """
     node = load_node(pk)
     if node.node_type == 'data.structure.StructureData.':
-        _export_structure(pk, get_data, show)
+        _export_structure(pk, get_data, show, fmt)
     elif node.node_type == 'data.array.kpoints.KpointsData.':
         _export_kpoints(pk)
     elif node.node_type == 'process.workflow.workchain.WorkChainNode.':
@@ -310,9 +372,9 @@ def main(pk, get_data=False, show=False, ev_range=4., ymax=None,
         elif workchain_name == 'RelaxWorkChain':
             _export_relax(pk, show)
         elif workchain_name == 'PhonopyWorkChain':
-            _export_phonon(pk, get_data, show)
+            _export_phonon(pk, get_data, show, fmt)
         elif workchain_name == 'ShearWorkChain':
-            _export_shear(pk, get_data, show)
+            _export_shear(pk, get_data, show, fmt)
         # elif workchain_name == 'TwinBoundaryWorkChain':
         #     _export_twinboundary(pk, get_data, show, ev_range)
         elif workchain_name == 'TwinBoundaryRelaxWorkChain':
@@ -323,10 +385,89 @@ def main(pk, get_data=False, show=False, ev_range=4., ymax=None,
             raise ValueError("workchain %s is not supported" % workchain_name)
     else:
         raise ValueError("object type %s is not supported" % node.node_type)
+    if get_data:
+        print_structure_analysis_stats()
+
+@with_dbenv()
+def main_group(group, output=None, incremental=False):
+    """
+    export all supported nodes in group to JSON Lines file
+
+        Parameters
+        ----------
+        group: str
+            group label
+        output: str, default None
+            output file name, if it ends with '.gz', gzip compressed
+            if None, '<group>.jsonl.gz'
+        incremental: bool, default False
+            if True, export only nodes new or modified since the last
+            export, which are recorded in '<output>.manifest.json'
+    """
+    if output is None:
+        output = group + '.jsonl.gz'
+    count = export_group(group, output, incremental=incremental)
+    print("{} nodes exported to {}".format(count, output))
+    print_structure_analysis_stats()
+
+@with_dbenv()
+def main_render(dirname, pk=None, group=None, fmt='png', workers=None):
+    """
+    render figures of node or all supported nodes in group without display
+
+        Parameters
+        ----------
+        dirname: str
+            output directory
+        pk: int, default None
+            node pk
+        group: str, default None
+            group label, used if pk is None
+        fmt: str, default 'png'
+            figure format, 'png' or 'pdf'
+        workers: int, default None
+            the number of render processes,
+            if None, the number of cpus
+
+        Raises
+        ------
+        ValueError
+            neither pk nor group is specified,
+            or process type of specified pk is not supported
+    """
+    if pk is None and group is None:
+        raise ValueError("specify pk or group to render")
+    if pk is not None:
+        process_type = load_node(pk).process_type
+        if process_type not in RENDER_PROCESS_TYPES:
+            raise ValueError("process type %s is not supported for render"
+                             % process_type)
+        nodes = [(pk, RENDER_PROCESS_TYPES[process_type])]
+    else:
+        nodes = [ (node['pk'], RENDER_PROCESS_TYPES[node['process_type']])
+                      for node in get_group_nodes(group)
+                      if node['process_type'] in RENDER_PROCESS_TYPES ]
+    results = render_nodes(nodes, dirname, fmt=fmt, workers=workers)
+    print("{} figures rendered to {}".format(len(results['files']), dirname))
+    print("fetch: {:.2f} sec, render: {:.2f} sec ({:.2f} figures / sec)".format(
+        results['fetch_time'], results['render_time'], results['throughput']))
 
 
 if __name__ == '__main__':
     args = get_argparse()
-    additional_relax_pks = list(map(int, args.additional_relax_pks.split()))
-    main(args.node_pk, args.get_data, args.show, args.ev_range, args.ymax,
-         additional_relax_pks)
+    if args.profile:
+        profiler = profile()
+    else:
+        profiler = contextlib.nullcontext()
+    with profiler as prof:
+        if args.render is not None:
+            main_render(args.render, args.node_pk, args.group,
+                        args.render_format, args.workers)
+        elif args.group is not None:
+            main_group(args.group, args.output, args.incremental)
+        else:
+            additional_relax_pks = list(map(int, args.additional_relax_pks.split()))
+            main(args.node_pk, args.get_data, args.show, args.ev_range, args.ymax,
+                 additional_relax_pks, args.format)
+    if args.profile:
+        print(format_report(prof.report()))
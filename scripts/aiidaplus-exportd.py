@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+
+"""
+This script runs warm export daemon and sends requests to it.
+
+  serve: run daemon which keeps aiida profile loaded
+  data:  export node data, format is detected by output extension
+  group: export group to JSON Lines
+  ping:  check daemon is running
+  stop:  shutdown daemon
+"""
+
+import os
+import sys
+import argparse
+from aiidaplus.daemon import request, serve
+
+# argparse
+def get_argparse():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument('command', type=str,
+        choices=['serve', 'data', 'group', 'ping', 'stop'],
+        help="command")
+    parser.add_argument('--socket', type=str, default=None,
+        help="socket file, default: $AIIDAPLUS_EXPORTD_SOCKET or "
+             "aiidaplus-exportd-<uid>.sock in temporary directory")
+    parser.add_argument('--workers', type=int, default=4,
+        help="the number of worker processes of 'serve', default: 4")
+    parser.add_argument('--profile', type=str, default=None,
+        help="aiida profile of 'serve', default: default profile")
+    parser.add_argument('-pk', '--node_pk', type=int, default=None,
+        help="node pk of 'data'")
+    parser.add_argument('--group', type=str, default=None,
+        help="group label of 'group'")
+    parser.add_argument('-o', '--output', type=str, default=None,
+        help="output file of 'data' (required) and 'group' "
+             "(default: <group>.jsonl.gz)")
+    parser.add_argument('--incremental', action='store_true',
+        help="incremental export of 'group'")
+    args = parser.parse_args()
+    return args
+
+def main(command, socket, workers, profile, pk, group, output, incremental):
+    if command == 'serve':
+        serve(socket_path=socket, workers=workers, profile=profile)
+        return
+
+    if command == 'data':
+        if pk is None or output is None:
+            sys.exit("'data' requires -pk and -o")
+        req = {'mode': 'data', 'pk': pk, 'output': os.path.abspath(output)}
+    elif command == 'group':
+        if group is None:
+            sys.exit("'group' requires --group")
+        if output is None:
+            output = group + '.jsonl.gz'
+        req = {'mode': 'group', 'group': group,
+               'output': os.path.abspath(output), 'incremental': incremental}
+    elif command == 'ping':
+        req = {'mode': 'ping'}
+    else:
+        req = {'mode': 'shutdown'}
+    try:
+        response = request(req, socket_path=socket)
+    except OSError as err:
+        sys.exit("export daemon is not running: {}".format(err))
+    print(response)
+    if response['status'] != 'ok':
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    args = get_argparse()
+    main(command=args.command,
+         socket=args.socket,
+         workers=args.workers,
+         profile=args.profile,
+         pk=args.node_pk,
+         group=args.group,
+         output=args.output,
+         incremental=args.incremental)
@@ -8,13 +8,13 @@
 ### import modules
 import os
 import argparse
-import yaml
 import numpy as np
 from matplotlib import pyplot as plt
 # from pymatgen.io import lobster as pmglobster
 from pymatgen.io.lobster import outputs as pmglobster
 from pymatgen.io import vasp as pmgvasp
 from pymatgen.electronic_structure import plotter as pmgplotter
+from aiidaplus.io import load_yaml
 
 def print_runmode():
     print("---------------")
@@ -77,9 +77,7 @@ def _load_yaml(yamlfile):
         yamlfile : str
             ex. vasper-log.yaml file
     """
-    with open(yamlfile, 'r') as f:
-        data = yaml.load(f, Loader=yaml.SafeLoader)
-    return data
+    return load_yaml(yamlfile)
 
 def _set_fig_property():
     # plt.rcParams['font.family'] = 'Times New Roman'
@@ -6,10 +6,15 @@
 This script deals with structure
 """
 
+import os
 import argparse
+import numpy as np
+from numpy.lib.format import open_memmap
 from aiida.cmdline.utils.decorators import with_dbenv
-from pymatgen.io.phonopy import get_ph_bs_symm_line
-import yaml
+from pymatgen.core.lattice import Lattice
+from pymatgen.core.structure import Structure
+from pymatgen.phonon.bandstructure import PhononBandStructureSymmLine
+from aiidaplus.band_yaml import read_band_yaml
 
 
 # argparse
@@ -24,34 +29,86 @@ def get_argparse():
                         type=str,
                         default='phononwebsite.json',
                         help="json file for phonon website")
+    parser.add_argument('--mmap_dir',
+                        type=str,
+                        default=None,
+                        help="directory for memory-mapped frequencies and "
+                             "eigenvectors, use for large band.yaml")
     args = parser.parse_args()
     return args
 
 
-@with_dbenv()
-def main(bandfile,
-         jsonfile,
-         ):
+def get_ph_bs_symm_line(data:dict,
+                        dirname:str=None) -> PhononBandStructureSymmLine:
+    """
+    get pymatgen band structure from 'read_band_yaml' output,
+    which is the same as 'pymatgen.io.phonopy.get_ph_bs_symm_line'
+    without parsing band.yaml again
 
-    with open(bandfile) as f:
-        data = yaml.load(f, Loader=yaml.SafeLoader)
+    Args:
+        dirname (str): if not None, eigendisplacements are written to
+                       memory-mapped 'eigendisplacements.npy' in dirname
+                       segment by segment
+    """
     labels_dict = {}
     count = 0
     for i, label in enumerate(data['labels']):
-        labels_dict[label[0]] = data['phonon'][count]['q-position']
+        labels_dict[label[0]] = data['q-positions'][count]
         count += data['segment_nqpoint'][i]
 
-    ph_bandsym = get_ph_bs_symm_line(bands_path=bandfile,
-                                     labels_dict=labels_dict)
-    try:
-        ph_bandsym.write_phononwebsite(filename=jsonfile)
-    except TypeError:
+    masses = np.array([ point['mass'] for point in data['points'] ])
+    structure = Structure(
+            lattice=data['lattice'],
+            species=[ point['symbol'] for point in data['points'] ],
+            coords=[ point['coordinates'] for point in data['points'] ],
+            site_properties={'phonopy_masses': masses})
+    qpoints = data['q-positions']
+    nqpoint, nband = data['frequencies'].shape
+    eigvecs = data['eigenvectors'].reshape(nqpoint, nband, -1, 3)
+    # eigenvectors to eigendisplacements, (nband, nqpoint, natom, 3)
+    shape = (nband, nqpoint, len(masses), 3)
+    if dirname is None:
+        eigdispls = np.empty(shape, dtype=complex)
+    else:
+        eigdispls = open_memmap(os.path.join(dirname, 'eigendisplacements.npy'),
+                                mode='w+', dtype=complex, shape=shape)
+    start = 0
+    for nq in data['segment_nqpoint']:
+        end = start + nq
+        phases = np.exp(2j * np.pi * np.dot(qpoints[start:end],
+                                            structure.frac_coords.T)) \
+                     / np.sqrt(masses)
+        eigdispls[:, start:end] = \
+                (eigvecs[start:end] * phases[:, np.newaxis, :, np.newaxis]) \
+                    .transpose(1, 0, 2, 3)
+        start = end
+    return PhononBandStructureSymmLine(
+            qpoints,
+            data['frequencies'].T,
+            Lattice(data['reciprocal_lattice']),
+            has_nac=False,
+            labels_dict=labels_dict,
+            structure=structure,
+            eigendisplacements=eigdispls)
+
+
+@with_dbenv()
+def main(bandfile,
+         jsonfile,
+         mmap_dir=None,
+         ):
+
+    data = read_band_yaml(bandfile, dirname=mmap_dir)
+    if data['eigenvectors'] is None:
         raise RuntimeError("NOTE: Error occurs. Check eigenvectors are stored "
                            "in band.yaml")
+    ph_bandsym = get_ph_bs_symm_line(data, dirname=mmap_dir)
+    ph_bandsym.write_phononwebsite(filename=jsonfile)
 
 
 if __name__ == '__main__':
     args = get_argparse()
     main(bandfile=args.bandfile,
          jsonfile=args.jsonfile,
+         mmap_dir=args.mmap_dir,
          )
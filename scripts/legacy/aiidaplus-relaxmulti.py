@@ -7,12 +7,12 @@ This script shows multi relax results
 """
 
 import os
-import yaml
 import numpy as np
 import argparse
 from pprint import pprint
 from matplotlib import pyplot as plt
 from aiidaplus.plot import line_chart_group, line_chart_group_trajectory
+from aiidaplus.io import load_data, is_supported_file
 from aiida.cmdline.utils.decorators import with_dbenv
 from aiida.orm import load_node
 
@@ -40,12 +40,16 @@ def get_argparse():
     return args
 
 def import_yamls(relax_dir):
-    yamlfiles = [ name for name in os.listdir(relax_dir) if 'yaml' in name ]
-    yamlfiles.sort()
+    """
+    import exported relax data, binary formats (npz, hdf5, parquet)
+    are also supported
+    """
+    files = [ name for name in os.listdir(relax_dir)
+                  if is_supported_file(name) ]
+    files.sort()
     relaxes = []
-    for yamlfile in yamlfiles:
-        with open(os.path.join(relax_dir, yamlfile)) as f:
-            relaxes.append(yaml.load(f, Loader=yaml.SafeLoader))
+    for filename in files:
+        relaxes.append(load_data(os.path.join(relax_dir, filename)))
     return relaxes
 
 def get_data(relaxes):